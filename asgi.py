@@ -0,0 +1,10 @@
+from dotenv import load_dotenv
+
+# before the app modules, some of which read settings at import
+load_dotenv()
+
+from src.aio.app import create_async_app  # noqa: E402
+
+# Read endpoints on asyncio, e.g.
+#   hypercorn asgi:app --workers 4 --bind 0.0.0.0:5001
+app = create_async_app()
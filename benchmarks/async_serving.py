@@ -0,0 +1,171 @@
+"""Read throughput of the sync WSGI app versus the asyncio ASGI app.
+
+Starts ``gunicorn run:app`` (sync workers, as in docker-compose.yml) and
+``hypercorn asgi:app`` with the same number of worker processes against the
+same seeded database, then drives each read endpoint from concurrent client
+threads for a fixed time. Reports requests/s and latency percentiles.
+
+    python -m benchmarks.async_serving --workers 4 --concurrency 64
+    python -m benchmarks.async_serving --database-url mysql+pymysql://...
+
+The asyncio app only pulls ahead when requests spend their time waiting on
+the database, so compare against MySQL over a real network; a local SQLite
+file answers faster than the extra event-loop overhead costs.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks.password_hashing import free_port, percentile, request
+from src.app import create_app, db
+from src.helpers.jwt_config import token_claims
+
+
+def seed(database_url, doctors, clients, appointments):
+    from src.appointments.models import Appointment
+    from src.users.models import User
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        doctor_rows = [
+            User("doctor", f"D{i}", f"L{i}", None, None, f"d{i}@bench.io", "secret")
+            for i in range(doctors)
+        ]
+        client_rows = [
+            User("client", f"C{i}", f"L{i}", None, None, f"c{i}@bench.io", "secret")
+            for i in range(clients)
+        ]
+        admin = User("admin", "A", "Dmin", None, None, "admin@bench.io", "secret")
+        db.session.add_all(doctor_rows + client_rows + [admin])
+        db.session.flush()
+
+        rng = random.Random(0)
+        start = datetime(2030, 1, 1, 9)
+        for n in range(appointments):
+            doctor = doctor_rows[n % doctors]
+            slot = start + timedelta(minutes=30 * (n // doctors))
+            client = rng.choice(client_rows)
+            db.session.add(Appointment(client.id, doctor.id, slot, None))
+        db.session.commit()
+
+        # the default access token lives a minute; outlast the run
+        lifetime = timedelta(hours=1)
+        return {
+            role: create_access_token(
+                identity=str(user.id),
+                additional_claims=token_claims(user),
+                expires_delta=lifetime,
+            )
+            for role, user in (("client", client_rows[0]), ("admin", admin))
+        }
+
+
+ENDPOINTS = [
+    ("client", "/users/doctors"),
+    ("admin", "/appointments/?expand=doctor,client"),
+    ("admin", "/appointments/count"),
+]
+
+
+def start_server(command, port, env):
+    process = subprocess.Popen(command, env={**os.environ, **env})
+    for _ in range(200):
+        try:
+            request(f"http://127.0.0.1:{port}/")
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{command[2]} did not start")
+
+
+def load(url, token, concurrency, duration):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        nonlocal errors
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = request(url, headers=headers)
+            mine.append((time.perf_counter() - started) * 1000)
+            failed += status != 200
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--appointments", type=int, default=5000)
+    parser.add_argument(
+        "--database-url",
+        default=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        help="sync SQLAlchemy URL; the ASGI app swaps in the asyncio driver",
+    )
+    args = parser.parse_args(argv)
+
+    tokens = seed(args.database_url, args.doctors, 200, args.appointments)
+    workers = str(args.workers)
+    servers = [
+        ("gunicorn", [sys.executable, "-m", "gunicorn", "--workers", workers]),
+        ("hypercorn", [sys.executable, "-m", "hypercorn", "--workers", workers]),
+    ]
+    env = {
+        "DATABASE_URL": args.database_url,
+        "PASSWORD_HASH_WORKERS": "0",
+        # measure the servers, not the limits in front of the views
+        "ADMISSION_CONTROL": "0",
+    }
+
+    for name, command in servers:
+        port = free_port()
+        app = "run:app" if name == "gunicorn" else "asgi:app"
+        command = command + ["--bind", f"127.0.0.1:{port}", "--log-level", "warning"]
+        server = start_server(command + [app], port, env)
+        try:
+            for role, path in ENDPOINTS:
+                url = f"http://127.0.0.1:{port}{path}"
+                latencies, errors = load(
+                    url, tokens[role], args.concurrency, args.duration
+                )
+                print(
+                    f"{name:9} {path:40} {len(latencies) / args.duration:7.1f} req/s "
+                    f"p50={statistics.median(latencies):6.1f}ms "
+                    f"p95={percentile(latencies, 95):6.1f}ms "
+                    f"p99={percentile(latencies, 99):6.1f}ms errors={errors}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
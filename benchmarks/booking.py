@@ -0,0 +1,146 @@
+"""Concurrent booking benchmark: one hot doctor versus many doctors.
+
+Every worker thread books appointments through POST /appointments/ with its
+own client account. In the "hot" scenario all workers race for the same
+doctor's slots; in the "spread" scenario each worker books its own doctor.
+Reports throughput, created/conflict counts and checks that no slot ended up
+double booked.
+
+    python -m benchmarks.booking --workers 8 --bookings 50
+    python -m benchmarks.booking --database-url mysql+pymysql://...
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+
+from src.app import create_app, db
+from src.helpers.jwt_config import token_claims
+
+
+def setup(app, workers, doctors):
+    from src.users.models import User
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        clients = [
+            User("client", "C", str(i), None, None, f"c{i}@bench.io", "secret")
+            for i in range(workers)
+        ]
+        doctor_rows = [
+            User("doctor", "D", str(i), None, None, f"d{i}@bench.io", "secret")
+            for i in range(doctors)
+        ]
+        db.session.add_all(clients + doctor_rows)
+        db.session.commit()
+        return (
+            [
+                (
+                    c.id,
+                    create_access_token(
+                        identity=str(c.id), additional_claims=token_claims(c)
+                    ),
+                )
+                for c in clients
+            ],
+            [d.id for d in doctor_rows],
+        )
+
+
+def run(app, clients, plan):
+    """Run ``plan[i]`` (a list of (doctor_id, date_time)) on worker ``i``."""
+    statuses = Counter()
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(len(clients))
+
+    def worker(client_id, token, bookings):
+        http = app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+        local = Counter()
+        start_barrier.wait()
+        for doctor_id, date_time in bookings:
+            response = http.post(
+                "/appointments/",
+                headers=headers,
+                json={
+                    "user_id": client_id,
+                    "doctor_id": doctor_id,
+                    "date_time": date_time.isoformat(),
+                },
+            )
+            local[response.status_code] += 1
+        with lock:
+            statuses.update(local)
+
+    threads = [
+        threading.Thread(target=worker, args=(client_id, token, plan[i]))
+        for i, (client_id, token) in enumerate(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, time.perf_counter() - started
+
+
+def double_bookings(app):
+    from src.appointments.models import Appointment
+
+    with app.app_context():
+        return (
+            db.session.query(Appointment.doctor_id, Appointment.date_time)
+            .filter(Appointment.holds_slot.is_not(None))
+            .group_by(Appointment.doctor_id, Appointment.date_time)
+            .having(func.count() > 1)
+            .count()
+        )
+
+
+def report(name, statuses, elapsed, duplicates):
+    total = sum(statuses.values())
+    print(
+        f"{name:7} {total:6d} requests in {elapsed:6.2f}s "
+        f"({total / elapsed:8.1f} req/s)  created={statuses[201]} "
+        f"conflicts={statuses[409]} "
+        f"errors={total - statuses[201] - statuses[409]}  "
+        f"double-booked={duplicates}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--bookings", type=int, default=50, help="per worker")
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp()
+    url = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": url})
+    start = datetime(2030, 1, 1, 8)
+    slots = [start + timedelta(minutes=30 * n) for n in range(args.bookings)]
+
+    for name in ("hot", "spread"):
+        doctors = 1 if name == "hot" else args.workers
+        clients, doctor_ids = setup(app, args.workers, doctors)
+        # hot: everyone wants the same doctor's slots, in the same order;
+        # spread: every worker books its own doctor
+        plan = [
+            [(doctor_ids[0 if name == "hot" else w], slot) for slot in slots]
+            for w in range(len(clients))
+        ]
+        statuses, elapsed = run(app, clients, plan)
+        report(name, statuses, elapsed, double_bookings(app))
+
+
+if __name__ == "__main__":
+    main()
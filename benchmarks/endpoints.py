@@ -0,0 +1,376 @@
+"""End-to-end benchmark of every blueprint's endpoints on a seeded dataset.
+
+Seeds a fresh database with ``seed_database`` (the same generator as
+``flask seed``), then sends each endpoint ``--requests`` authenticated
+requests from ``--concurrency`` client threads through the Flask test client.
+Reports p50/p95/p99 latency, throughput, errors and SQL statements per
+request (from the SQL profiler).
+
+    python -m benchmarks.endpoints --save benchmarks/baselines/sqlite.json
+    python -m benchmarks.endpoints --baseline benchmarks/baselines/sqlite.json
+    python -m benchmarks.endpoints --database-url mysql+pymysql://... --only appointments
+
+With ``--baseline`` the run is compared to a saved one and exits non-zero
+when an endpoint issues more queries per request, or its p95 grows by more
+than ``--latency-tolerance``.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy.engine import make_url
+
+from benchmarks.password_hashing import percentile
+from src.app import create_app, db
+from src.helpers.jwt_config import token_claims
+from src.helpers.profiler import get_profiler
+
+SEED_START = datetime(2030, 1, 7, 9)
+
+
+def setup(app, args):
+    from src.appointments.models import Appointment
+    from src.availability.models import Availability
+    from src.helpers.seed import seed_database
+    from src.users.models import User
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        counts = seed_database(
+            doctors=args.doctors,
+            clients=args.clients,
+            availability=args.availability,
+            appointments=args.appointments,
+            start=SEED_START,
+        )
+
+        admin = User.query.filter_by(role="admin").first()
+        doctor = User.query.filter_by(role="doctor").order_by(User.id).first()
+        client = User.query.filter_by(role="client").order_by(User.id).first()
+        # a client nobody else uses, toggled by the block endpoint
+        blockable = User.query.filter_by(role="client").order_by(User.id.desc()).first()
+        appointment = Appointment.query.filter_by(
+            doctor_id=doctor.id, status="up-coming"
+        ).first()
+        availability = Availability.query.filter_by(doctor_id=doctor.id).first()
+        doctor_ids = [
+            u.id for u in User.query.filter_by(role="doctor").order_by(User.id)
+        ][:10]
+
+        # the default access token lives a minute; outlast the run
+        lifetime = timedelta(hours=1)
+        return counts, {
+            "tokens": {
+                user.role: create_access_token(
+                    identity=str(user.id),
+                    additional_claims=token_claims(user),
+                    expires_delta=lifetime,
+                )
+                for user in (admin, doctor, client)
+            },
+            "refresh": create_refresh_token(
+                identity=str(client.id), additional_claims=token_claims(client)
+            ),
+            "admin": admin.id,
+            "doctor": doctor.id,
+            "client": client.id,
+            "client_email": client.email,
+            "blockable": blockable.id,
+            "appointment": appointment.id,
+            "availability": availability.id,
+            "doctor_ids": ",".join(map(str, doctor_ids)),
+        }
+
+
+def endpoints(ctx):
+    """``(name, role, method, request(i) -> (url, json))`` for every endpoint."""
+    window = "from=2030-01-07T00:00:00&to=2030-01-14T00:00:00"
+    return [
+        # auth
+        (
+            "POST /auth/login",
+            None,
+            "POST",
+            lambda i: (
+                "/auth/login",
+                {"email": ctx["client_email"], "password": "secret"},
+            ),
+        ),
+        ("GET /auth/user/me", "client", "GET", lambda i: ("/auth/user/me", None)),
+        ("GET /auth/refresh", "refresh", "GET", lambda i: ("/auth/refresh", None)),
+        # admin
+        ("GET /admin/users/", "admin", "GET", lambda i: ("/admin/users/", None)),
+        (
+            "PUT /admin/users/block/<id>",
+            "admin",
+            "PUT",
+            lambda i: (f"/admin/users/block/{ctx['blockable']}", None),
+        ),
+        ("GET /admin/db/pool", "admin", "GET", lambda i: ("/admin/db/pool", None)),
+        # users
+        ("GET /users/", "admin", "GET", lambda i: ("/users/", None)),
+        ("GET /users/doctors", "client", "GET", lambda i: ("/users/doctors", None)),
+        (
+            "GET /users/doctors?q=",
+            "client",
+            "GET",
+            lambda i: ("/users/doctors?q=cardio", None),
+        ),
+        (
+            "GET /users/<id>",
+            "client",
+            "GET",
+            lambda i: (f"/users/{ctx['doctor']}", None),
+        ),
+        (
+            "PUT /users/<id>",
+            "client",
+            "PUT",
+            lambda i: (f"/users/{ctx['client']}", {"address": f"{i} Bench Road"}),
+        ),
+        # availability
+        ("GET /availability/", "doctor", "GET", lambda i: ("/availability/", None)),
+        (
+            "GET /availability/<id>",
+            "doctor",
+            "GET",
+            lambda i: (f"/availability/{ctx['availability']}", None),
+        ),
+        (
+            "GET /availability/doctors/<id>/slots",
+            "client",
+            "GET",
+            lambda i: (f"/availability/doctors/{ctx['doctor']}/slots?{window}", None),
+        ),
+        (
+            "GET /availability/slots",
+            "client",
+            "GET",
+            lambda i: (
+                f"/availability/slots?doctor_ids={ctx['doctor_ids']}&{window}",
+                None,
+            ),
+        ),
+        (
+            "GET /availability/rules",
+            "doctor",
+            "GET",
+            lambda i: ("/availability/rules", None),
+        ),
+        (
+            "POST /availability/",
+            "doctor",
+            "POST",
+            lambda i: (
+                "/availability/",
+                {
+                    "doctor_id": ctx["doctor"],
+                    "date_time": (
+                        datetime(2031, 1, 1) + timedelta(minutes=30 * i)
+                    ).isoformat(),
+                },
+            ),
+        ),
+        # appointments
+        ("GET /appointments/", "client", "GET", lambda i: ("/appointments/", None)),
+        (
+            "GET /appointments/?expand=",
+            "admin",
+            "GET",
+            lambda i: ("/appointments/?expand=doctor,client", None),
+        ),
+        (
+            "GET /appointments/count",
+            "doctor",
+            "GET",
+            lambda i: ("/appointments/count", None),
+        ),
+        (
+            "GET /appointments/<id>",
+            "doctor",
+            "GET",
+            lambda i: (f"/appointments/{ctx['appointment']}", None),
+        ),
+        (
+            "POST /appointments/",
+            "client",
+            "POST",
+            lambda i: (
+                "/appointments/",
+                {
+                    "user_id": ctx["client"],
+                    "doctor_id": ctx["doctor"],
+                    "date_time": (
+                        datetime(2032, 1, 1) + timedelta(minutes=30 * i)
+                    ).isoformat(),
+                },
+            ),
+        ),
+        (
+            "PUT /appointments/status/<id>",
+            "doctor",
+            "PUT",
+            lambda i: (
+                f"/appointments/status/{ctx['appointment']}",
+                {"status": "up-coming"},
+            ),
+        ),
+    ]
+
+
+def run_endpoint(app, headers, method, make_request, requests, concurrency):
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, errors = [], 0
+
+    def worker():
+        nonlocal errors
+        http = app.test_client()
+        mine, failed = [], 0
+        while True:
+            with lock:
+                i = next(counter)
+            if i >= requests:
+                break
+            url, body = make_request(i)
+            started = time.perf_counter()
+            response = http.open(url, method=method, headers=headers, json=body)
+            mine.append((time.perf_counter() - started) * 1000)
+            failed += not 200 <= response.status_code < 300
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def queries_per_request(app):
+    with app.app_context():
+        endpoints = get_profiler().to_dict()["endpoints"]
+    # every request of a run hits the same view
+    requests = sum(stats["requests"] for stats in endpoints.values())
+    queries = sum(
+        stats["avg_queries"] * stats["requests"] for stats in endpoints.values()
+    )
+    return round(queries / requests, 2) if requests else None
+
+
+def compare(results, baseline, tolerance):
+    """Print regressions against ``baseline``; returns how many were found."""
+    regressions = 0
+    for name, current in results["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        problems = []
+        if (current["queries_per_request"] or 0) > (
+            before["queries_per_request"] or 0
+        ) + 0.01:
+            problems.append(
+                f"queries {before['queries_per_request']} -> "
+                f"{current['queries_per_request']}"
+            )
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            problems.append(f"p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["errors"] > before["errors"]:
+            problems.append(f"errors {before['errors']} -> {current['errors']}")
+        if problems:
+            regressions += 1
+            print(f"REGRESSION {name}: {', '.join(problems)}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--availability", type=int, default=40, help="per doctor")
+    parser.add_argument("--appointments", type=int, default=20, help="per doctor")
+    parser.add_argument("--only", help="run endpoints whose name contains this")
+    parser.add_argument("--save", help="write the results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    url = args.database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    )
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": url,
+            "SQL_PROFILER": True,
+            "ADMISSION_CONTROL": False,
+        }
+    )
+    counts, ctx = setup(app, args)
+
+    results = {
+        "settings": {
+            "database": make_url(url).get_backend_name(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "dataset": counts,
+        },
+        "endpoints": {},
+    }
+    for name, role, method, make_request in endpoints(ctx):
+        if args.only and args.only not in name:
+            continue
+        token = ctx["refresh"] if role == "refresh" else ctx["tokens"].get(role)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+        with app.app_context():
+            get_profiler().reset()
+        latencies, errors, elapsed = run_endpoint(
+            app, headers, method, make_request, args.requests, args.concurrency
+        )
+        result = {
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "rps": round(len(latencies) / elapsed, 1),
+            "queries_per_request": queries_per_request(app),
+            "errors": errors,
+        }
+        results["endpoints"][name] = result
+        print(
+            f"{name:38} {result['rps']:8.1f} req/s  p50={result['p50_ms']:7.2f}ms "
+            f"p95={result['p95_ms']:7.2f}ms p99={result['p99_ms']:7.2f}ms  "
+            f"queries={result['queries_per_request']}  errors={errors}"
+        )
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.latency_tolerance):
+            sys.exit(1)
+        print("no regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Latency of ordinary endpoints while a burst of logins is in progress.
+
+Starts gunicorn with 4 sync workers (as in docker-compose.yml) against a
+throwaway SQLite database, once hashing inline (PASSWORD_HASH_WORKERS=0), once
+with the hashing process pool and once with the pool behind admission control
+(``--preload``, so the workers share its limits), and measures GET
+/users/doctors latency with and without concurrent POST /auth/login traffic.
+
+    python -m benchmarks.password_hashing
+    python -m benchmarks.password_hashing --login-threads 16 --pool-workers 2
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from flask_jwt_extended import create_access_token
+
+from src.app import create_app, db
+from src.helpers.jwt_config import token_claims
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def request(url, data=None, headers=None):
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers=headers or {})
+    if body is not None:
+        req.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def seed(database_url, logins):
+    from src.users.models import User
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    with app.app_context():
+        db.create_all()
+        users = [
+            User("client", "C", str(i), None, None, f"c{i}@bench.io", "secret")
+            for i in range(logins)
+        ]
+        users += [
+            User("doctor", "D", str(i), None, None, f"d{i}@bench.io", "secret")
+            for i in range(20)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return create_access_token(
+            identity=str(users[0].id), additional_claims=token_claims(users[0])
+        )
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url, port, env, flags=()):
+    app_spec = f"src.app:create_app({{'SQLALCHEMY_DATABASE_URI': {database_url!r}}})"
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--workers",
+            "4",
+            *flags,
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--log-level",
+            "warning",
+            app_spec,
+        ],
+        # the login burst is the load under test, not something to shed
+        env={**os.environ, "ADMISSION_CONTROL": "0", **env},
+    )
+    for _ in range(100):
+        try:
+            request(f"http://127.0.0.1:{port}/")
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def measure_reads(base, token, count):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        request(f"{base}/users/doctors", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def login_burst(base, threads, stop):
+    statuses = []
+    lock = threading.Lock()
+
+    def worker(i):
+        while not stop.is_set():
+            status = request(
+                f"{base}/auth/login",
+                data={"email": f"c{i}@bench.io", "password": "secret"},
+            )
+            with lock:
+                statuses.append(status)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    return workers, statuses
+
+
+def summary(latencies):
+    return (
+        f"p50={statistics.median(latencies):7.1f}ms "
+        f"p95={percentile(latencies, 95):7.1f}ms "
+        f"p99={percentile(latencies, 99):7.1f}ms"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--login-threads", type=int, default=12)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--pool-workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    token = seed(database_url, args.login_threads)
+
+    pool = {"PASSWORD_HASH_WORKERS": str(args.pool_workers)}
+    scenarios = [
+        ("inline", {"PASSWORD_HASH_WORKERS": "0"}, ()),
+        ("pool", pool, ()),
+        ("admit", {**pool, "ADMISSION_CONTROL": "1"}, ("--preload",)),
+    ]
+    for name, env, flags in scenarios:
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        server = start_server(database_url, port, env, flags)
+        try:
+            idle = measure_reads(base, token, args.reads)
+
+            stop = threading.Event()
+            threads, statuses = login_burst(base, args.login_threads, stop)
+            started = time.perf_counter()
+            busy = measure_reads(base, token, args.reads)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+
+        ok = statuses.count(200)
+        print(f"{name:6} idle  reads: {summary(idle)}")
+        print(
+            f"{name:6} burst reads: {summary(busy)}  "
+            f"logins={ok / elapsed:6.1f}/s "
+            f"shed={statuses.count(503)} limited={statuses.count(429)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Cost of building a large JSON list response, ORM objects versus projections.
+
+Seeds ``--rows`` appointments, then times the three stages of a list endpoint
+for each combination of loader and JSON provider:
+
+- ``orm``: ``Appointment.query`` + ``to_dict()`` (the path before projections)
+- ``projection``: ``APPOINTMENT_PROJECTION`` row tuples + ``to_dict(row)``
+
+encoded with Flask's ``DefaultJSONProvider`` (stdlib json) and with the
+orjson provider. Every run starts from an empty session, as a request does.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 50000 --repeat 5
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import tempfile
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from src.app import create_app, db
+from src.helpers.json_provider import ORJSONProvider, orjson
+
+
+def seed(rows):
+    from src.helpers.seed import seed_database
+
+    doctors = max(1, (rows + 99) // 100)
+    db.drop_all()
+    db.create_all()
+    seed_database(doctors=doctors, clients=200, availability=100, appointments=100)
+
+
+def load_orm(rows):
+    from src.appointments.models import Appointment
+
+    appointments = Appointment.query.order_by(Appointment.id).limit(rows).all()
+    return appointments, lambda: [a.to_dict() for a in appointments]
+
+
+def load_projection(rows):
+    from src.appointments.models import APPOINTMENT_PROJECTION, Appointment
+
+    query = APPOINTMENT_PROJECTION.query().order_by(Appointment.id).limit(rows)
+    records = query.all()
+    return records, lambda: [APPOINTMENT_PROJECTION.to_dict(r) for r in records]
+
+
+def measure(load, provider, rows):
+    db.session.remove()
+    gc.collect()  # don't bill this run for the last one's garbage
+    started = time.perf_counter()
+    _, build = load(rows)
+    loaded = time.perf_counter()
+    payload = {"appointments": build(), "next_cursor": None}
+    built = time.perf_counter()
+    body = provider.response(payload).get_data()
+    encoded = time.perf_counter()
+    return (loaded - started, built - loaded, encoded - built), len(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": url})
+    providers = [("json", DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(("orjson", ORJSONProvider(app)))
+    else:
+        print("orjson is not installed; timing the stdlib provider only")
+
+    with app.app_context():
+        seed(args.rows)
+        print(
+            f"{'loader':11} {'json':7} {'query':>9} {'to_dict':>9} "
+            f"{'encode':>9} {'total':>9}  bytes"
+        )
+        for loader_name, load in (("orm", load_orm), ("projection", load_projection)):
+            for provider_name, provider in providers:
+                measure(load, provider, args.rows)  # warm up
+                runs = [measure(load, provider, args.rows) for _ in range(args.repeat)]
+                stages = [
+                    statistics.median(run[0][i] for run in runs) * 1000
+                    for i in range(3)
+                ]
+                total = statistics.median(sum(run[0]) for run in runs) * 1000
+                print(
+                    f"{loader_name:11} {provider_name:7} "
+                    + "".join(f"{ms:8.1f}ms" for ms in stages)
+                    + f"{total:8.1f}ms  {runs[0][1]}"
+                )
+
+
+if __name__ == "__main__":
+    main()
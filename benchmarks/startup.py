@@ -0,0 +1,134 @@
+"""Time-to-first-request of new gunicorn workers, with and without --preload
+and the post-fork warm-up of gunicorn.conf.py.
+
+For each setup, starts ``gunicorn run:app`` against one seeded SQLite file
+and reports:
+
+- ``first``: from spawning gunicorn to the first 200 of ``GET /users/doctors``
+- ``wave``: slowest and median latency of one concurrent request per worker,
+  sent once every worker has had ``--settle`` seconds to finish booting, i.e.
+  what the first users of each fresh worker see
+- ``warm``: median latency once every worker has served requests
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --workers 8 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks.password_hashing import free_port, request
+from src.app import create_app, db
+from src.helpers.jwt_config import token_claims
+
+SETUPS = [
+    ("fork+import", [], "0"),
+    ("preload", ["--preload"], "0"),
+    ("preload+warm-up", ["--preload"], "1"),
+]
+
+PATH = "/users/doctors"
+
+
+def seed(database_url):
+    from src.helpers.seed import seed_database
+    from src.users.models import User
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_database()
+        client = User.query.filter_by(role="client").first()
+        return create_access_token(
+            identity=str(client.id),
+            additional_claims=token_claims(client),
+            expires_delta=timedelta(hours=1),
+        )
+
+
+def timed(url, headers):
+    started = time.perf_counter()
+    status = request(url, headers=headers)
+    return status, (time.perf_counter() - started) * 1000
+
+
+def run_setup(flags, warmup, workers, settle, database_url, headers):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{PATH}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "PASSWORD_HASH_WORKERS": "0",
+        "WARMUP": warmup,
+        "ADMISSION_CONTROL": "0",
+    }
+    command = [sys.executable, "-m", "gunicorn", "--workers", str(workers)]
+    command += flags + ["--bind", f"127.0.0.1:{port}", "--log-level", "warning"]
+
+    spawned = time.perf_counter()
+    process = subprocess.Popen(command + ["run:app"], env=env)
+    try:
+        while True:
+            try:
+                if request(url, headers=headers) == 200:
+                    break
+            except OSError:
+                pass
+            if time.perf_counter() - spawned > 60:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.01)
+        first = (time.perf_counter() - spawned) * 1000
+        time.sleep(settle)
+
+        wave = [None] * workers
+
+        def hit(i):
+            wave[i] = timed(url, headers)[1]
+
+        threads = [threading.Thread(target=hit, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for _ in range(workers * 5):
+            timed(url, headers)
+        warm = statistics.median(timed(url, headers)[1] for _ in range(50))
+        return first, max(wave), statistics.median(wave), warm
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--settle", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    headers = {"Authorization": f"Bearer {seed(database_url)}"}
+
+    print(f"{'setup':16} {'first':>9} {'wave max':>9} {'wave p50':>9} {'warm p50':>9}")
+    for name, flags, warmup in SETUPS:
+        runs = [
+            run_setup(flags, warmup, args.workers, args.settle, database_url, headers)
+            for _ in range(args.repeat)
+        ]
+        medians = [statistics.median(run[i] for run in runs) for i in range(4)]
+        print(f"{name:16} " + " ".join(f"{ms:7.1f}ms" for ms in medians))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Gunicorn hooks, picked up from the working directory by default.
+
+    gunicorn --preload --workers 4 --bind 0.0.0.0:5000 run:app
+
+With ``--preload`` the app is imported once in the master and every worker
+starts as a fork of it. The hooks keep the master from handing its database
+connections to the workers and warm each worker up before it takes requests
+(see ``src/helpers/startup.py``; ``WARMUP=0`` turns the warm-up off).
+"""
+
+from flask import Flask
+
+
+def when_ready(server):
+    # nothing should have connected while loading the app, but a forked
+    # worker must never share a socket with the master
+    if server.cfg.preload_app:
+        from src.app import db
+
+        app = server.app.wsgi()
+        if isinstance(app, Flask):
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+
+
+def post_worker_init(worker):
+    if isinstance(worker.wsgi, Flask):
+        from src.helpers.startup import prepare_worker
+
+        prepare_worker(worker.wsgi)
@@ -0,0 +1,27 @@
+"""add users security version
+
+Revision ID: 607b462a5ccf
+Revises: 9046f6484799
+Create Date: 2026-10-18 18:36:56.945487
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '607b462a5ccf'
+down_revision = '9046f6484799'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        # existing rows start at 0, like new ones
+        batch_op.add_column(sa.Column('security_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('security_version')
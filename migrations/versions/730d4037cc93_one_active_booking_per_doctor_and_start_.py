@@ -0,0 +1,49 @@
+"""one active booking per doctor and start time
+
+Revision ID: 730d4037cc93
+Revises: ff47a7554238
+Create Date: 2026-10-18 17:48:28.831689
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '730d4037cc93'
+down_revision = 'ff47a7554238'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('holds_slot', sa.Boolean(), nullable=True))
+
+    # Existing double bookings stay in place, but only the oldest appointment
+    # per (doctor_id, date_time) keeps holding the slot.
+    op.execute(
+        """
+        UPDATE appointments SET holds_slot = 1
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT MIN(id) AS id FROM appointments
+                WHERE COALESCE(status, 'up-coming') <> 'canceled'
+                GROUP BY doctor_id, date_time
+            ) AS keep
+        )
+        """
+    )
+
+    # Create the unique index before dropping the old one so the doctor_id
+    # foreign key is backed by an index throughout (required by MySQL).
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('uq_appointments_doctor_id_date_time_holds_slot', ['doctor_id', 'date_time', 'holds_slot'], unique=True)
+        batch_op.drop_index('ix_appointments_doctor_id_date_time')
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_doctor_id_date_time', ['doctor_id', 'date_time'], unique=False)
+        batch_op.drop_index('uq_appointments_doctor_id_date_time_holds_slot')
+        batch_op.drop_column('holds_slot')
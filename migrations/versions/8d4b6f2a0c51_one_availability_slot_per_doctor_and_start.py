@@ -0,0 +1,57 @@
+"""one availability slot per doctor and start time
+
+Revision ID: 8d4b6f2a0c51
+Revises: 5a1e8c3f9d27
+Create Date: 2026-10-18 22:10:19.447120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4b6f2a0c51'
+down_revision = '5a1e8c3f9d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest of every duplicated slot; nothing references
+    # availability rows, so the copies can go.
+    removed = op.get_bind().execute(
+        sa.text(
+            """
+            DELETE FROM availability
+            WHERE id NOT IN (
+                SELECT id FROM (
+                    SELECT MIN(id) AS id FROM availability
+                    GROUP BY doctor_id, date_time
+                ) AS keep
+            )
+            """
+        )
+    ).rowcount
+    if removed:
+        # the daily rollup counted the copies
+        op.execute(
+            """
+            UPDATE doctor_daily_stats SET slots = (
+                SELECT COUNT(*) FROM availability
+                WHERE availability.doctor_id = doctor_daily_stats.doctor_id
+                AND DATE(availability.date_time) = doctor_daily_stats.day
+            )
+            """
+        )
+
+    # Create the unique index before dropping the old one so the doctor_id
+    # foreign key is backed by an index throughout (required by MySQL).
+    with op.batch_alter_table('availability', schema=None) as batch_op:
+        batch_op.create_index('uq_availability_doctor_id_date_time', ['doctor_id', 'date_time'], unique=True)
+        batch_op.drop_index('ix_availability_doctor_id_date_time')
+
+
+def downgrade():
+    with op.batch_alter_table('availability', schema=None) as batch_op:
+        batch_op.create_index('ix_availability_doctor_id_date_time', ['doctor_id', 'date_time'], unique=False)
+        batch_op.drop_index('uq_availability_doctor_id_date_time')
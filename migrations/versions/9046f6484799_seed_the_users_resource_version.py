@@ -0,0 +1,39 @@
+"""seed the users resource version
+
+Revision ID: 9046f6484799
+Revises: 65be507bd407
+Create Date: 2026-10-18 18:11:46.951313
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9046f6484799'
+down_revision = '65be507bd407'
+branch_labels = None
+depends_on = None
+
+
+resource_versions = sa.table(
+    'resource_versions',
+    sa.column('name', sa.String),
+    sa.column('version', sa.Integer),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def upgrade():
+    now = datetime.utcnow().replace(microsecond=0)
+    op.bulk_insert(resource_versions, [
+        {'name': 'users', 'version': 0, 'updated_at': now},
+    ])
+
+
+def downgrade():
+    op.execute(
+        resource_versions.delete().where(resource_versions.c.name == 'users')
+    )
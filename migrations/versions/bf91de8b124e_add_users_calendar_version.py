@@ -0,0 +1,27 @@
+"""add users calendar version
+
+Revision ID: bf91de8b124e
+Revises: 607b462a5ccf
+Create Date: 2026-10-18 18:52:15.084578
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bf91de8b124e'
+down_revision = '607b462a5ccf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        # existing rows start at 0, like new ones
+        batch_op.add_column(sa.Column('calendar_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('calendar_version')
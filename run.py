@@ -2,9 +2,11 @@ import os
 
 from dotenv import load_dotenv
 
-from src.app import create_app, db
-
+# before the app modules, some of which read settings at import
 load_dotenv()
+
+from src.app import create_app, db  # noqa: E402
+
 ENV = os.getenv("ENV", "development")
 DEBUG = bool(os.getenv("DEBUG", True if ENV == "development" else False))
 PORT = int(os.getenv("PORT", 3000))
@@ -0,0 +1,83 @@
+"""Assert how many SQL statements each endpoint issues per request.
+
+Access tokens carry the caller's role, so authorization costs no query on
+reads; with the default per-worker revocation store, writes also re-read the
+caller's users row (one statement). The numbers below include it. Update them deliberately
+when an endpoint's query shape changes.
+
+    python -m scripts.check_query_counts
+"""
+
+import sys
+
+from flask_jwt_extended import create_access_token
+
+from scripts.check_query_plans import seed
+from src.app import create_app, db
+from src.appointments.calendar import feed_token
+from src.helpers.jwt_config import token_claims
+from src.helpers.query_count import assert_query_count
+
+
+def expected_counts(people):
+    doctor_id = people["doctor"].id
+    client_id = people["client"].id
+    doctor_feed = feed_token(doctor_id, 0)
+    client_feed = feed_token(client_id, 0)
+    return [
+        ("admin", "GET", "/admin/users/", 1),
+        ("admin", "GET", "/users/", 1),
+        ("client", "GET", "/users/doctors", 2),
+        ("client", "GET", f"/users/{doctor_id}", 1),
+        ("client", "GET", "/auth/user/me", 1),
+        ("client", "GET", "/appointments/", 1),
+        ("client", "GET", "/appointments/?expand=doctor,client", 1),
+        ("client", "GET", "/appointments/count", 1),
+        ("doctor", "GET", "/appointments/", 1),
+        ("doctor", "GET", "/appointments/1", 1),
+        ("doctor", "GET", "/appointments/1?expand=doctor,client", 1),
+        ("admin", "GET", "/availability/", 2),
+        # the rollup and the recurring rules (none seeded, so no slot query)
+        ("admin", "GET", "/admin/analytics?from=2025-01-01&to=2025-01-31", 2),
+        ("doctor", "GET", "/availability/", 2),
+        ("doctor", "GET", "/availability/1", 1),
+        # the user row, their appointments and (doctors) their stored slots
+        # and recurring rules
+        ("doctor", "GET", f"/appointments/calendar/{doctor_feed}.ics", 4),
+        ("client", "GET", f"/appointments/calendar/{client_feed}.ics", 2),
+        ("client", "POST", "/auth/logout", 1),
+        # last: blocking revokes the client's token
+        ("admin", "PUT", f"/admin/users/block/{client_id}", 4),
+        ("admin", "PUT", f"/admin/users/block/{client_id}", 4),
+    ]
+
+
+def main():
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+    with app.app_context():
+        db.create_all()
+        people = seed()
+        tokens = {
+            role: create_access_token(
+                identity=str(user.id), additional_claims=token_claims(user)
+            )
+            for role, user in people.items()
+        }
+        checks = expected_counts(people)
+
+    client = app.test_client()
+    failures = 0
+    for role, method, url, expected in checks:
+        headers = {"Authorization": f"Bearer {tokens[role]}"}
+        try:
+            assert_query_count(client, method, url, expected, headers=headers)
+            print(f"[ok]   {role:6} {method} {url} ({expected})")
+        except AssertionError as e:
+            failures += 1
+            print(f"[FAIL] {role:6} {e}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
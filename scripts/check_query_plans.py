@@ -0,0 +1,209 @@
+"""EXPLAIN every SELECT the blueprint routes issue and fail on full table scans.
+
+Builds the app against a throwaway SQLite database (or ``--database-url``),
+seeds a small dataset, calls each read route as every role and runs the
+captured statements through the database's query planner.
+
+    python -m scripts.check_query_plans
+    python -m scripts.check_query_plans --database-url mysql+pymysql://...
+
+Statements without a WHERE clause (plain "list everything" queries) are
+reported but not counted as failures: scanning is the only way to answer them.
+"""
+
+import argparse
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, text
+
+from src.app import create_app, db
+from src.appointments.calendar import feed_token
+from src.helpers.jwt_config import token_claims
+
+SEED_DOCTORS = 50
+SEED_CLIENTS = 200
+SEED_ROWS_PER_DOCTOR = 20
+
+
+def seed():
+    from src.admin.analytics import backfill_daily_stats
+    from src.appointments.models import Appointment
+    from src.availability.models import Availability
+    from src.helpers.conditional import AVAILABILITY, DOCTORS, USERS, bump_version
+    from src.users.models import User
+
+    users = []
+    for i in range(SEED_DOCTORS):
+        users.append(
+            User("doctor", f"Doc{i}", f"Last{i}", None, None, f"d{i}@x.io", "secret")
+        )
+    for i in range(SEED_CLIENTS):
+        users.append(
+            User("client", f"Cli{i}", f"Last{i}", None, None, f"c{i}@x.io", "secret")
+        )
+    users.append(User("admin", "Ad", "Min", None, None, "admin@x.io", "secret"))
+    db.session.add_all(users)
+    db.session.flush()
+
+    doctors = [u for u in users if u.role == "doctor"]
+    clients = [u for u in users if u.role == "client"]
+    start = datetime(2025, 1, 1, 9)
+    rng = random.Random(0)
+    for doctor in doctors:
+        for n in range(SEED_ROWS_PER_DOCTOR):
+            slot = start + timedelta(days=n // 8, minutes=30 * (n % 8))
+            db.session.add(Availability(doctor.id, slot))
+            db.session.add(Appointment(rng.choice(clients).id, doctor.id, slot, None))
+    # creates the version rows the migrations seed
+    bump_version(DOCTORS, AVAILABILITY, USERS)
+    db.session.flush()
+    backfill_daily_stats()
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    return {
+        role: next(u for u in users if u.role == role)
+        for role in ("admin", "doctor", "client")
+    }
+
+
+def read_routes(people):
+    doctor_id = people["doctor"].id
+    client_id = people["client"].id
+    return {
+        "admin": [
+            "/admin/users/",
+            "/users/",
+            "/users/doctors?first_name=Doc1",
+            f"/users/{doctor_id}",
+            "/appointments/",
+            f"/appointments/?doctor_id={doctor_id}&from=2025-01-02",
+            "/appointments/count?status=up-coming",
+            "/availability/",
+            "/availability/1",
+            "/admin/analytics?from=2025-01-01&to=2025-01-31",
+            f"/admin/analytics?from=2025-01-01&to=2025-01-31&by=doctor_day"
+            f"&doctor_id={doctor_id}",
+        ],
+        "doctor": [
+            "/appointments/",
+            "/appointments/?from=2025-01-01&to=2025-01-02",
+            "/appointments/?stream=1&limit=5",
+            "/appointments/count",
+            "/appointments/1",
+            "/availability/",
+            f"/users/{client_id}",
+            f"/appointments/calendar/{feed_token(doctor_id, 0)}.ics",
+        ],
+        "client": [
+            "/users/doctors",
+            "/users/doctors?last_name=Last2",
+            "/appointments/",
+            "/appointments/?expand=doctor,client",
+            "/appointments/count",
+            "/availability/",
+            "/auth/user/me",
+            f"/appointments/calendar/{feed_token(client_id, 0)}.ics",
+            f"/availability/doctors/{doctor_id}/slots?from=2025-01-01&to=2025-01-03",
+            f"/availability/slots?doctor_ids={doctor_id},{doctor_id + 1}"
+            "&from=2025-01-01&to=2025-01-08",
+        ],
+    }
+
+
+def explain(connection, statement, params):
+    """Return (plan lines, full_scan) for one statement."""
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, params
+        ).fetchall()
+        lines = [row[-1] for row in rows]
+        full_scan = any(
+            line.startswith("SCAN ") and " USING " not in line for line in lines
+        )
+        return lines, full_scan
+
+    result = connection.exec_driver_sql("EXPLAIN " + statement, params)
+    keys = list(result.keys())
+    lines, full_scan = [], False
+    for row in result.fetchall():
+        row = dict(zip(keys, row))
+        lines.append(f"{row.get('table')}: type={row.get('type')} key={row.get('key')}")
+        full_scan = full_scan or row.get("type") == "ALL"
+    return lines, full_scan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args(argv)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database_url})
+    captured = []
+
+    with app.app_context():
+        db.create_all()
+        people = seed()
+        tokens = {
+            role: create_access_token(
+                identity=str(user.id), additional_claims=token_claims(user)
+            )
+            for role, user in people.items()
+        }
+        routes = read_routes(people)
+        engine = db.engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((route, statement, parameters))
+
+    # Requests run outside the seeding app context so each one gets its own
+    # ``g`` and nothing (e.g. a verified JWT) leaks between them.
+    event.listen(engine, "before_cursor_execute", capture)
+    client = app.test_client()
+    for role, role_routes in routes.items():
+        headers = {"Authorization": f"Bearer {tokens[role]}"}
+        for route in role_routes:
+            response = client.get(route, headers=headers)
+            response.get_data()  # streamed bodies query while they are read
+            if response.status_code >= 500:
+                print(f"!! {role} GET {route} -> {response.status_code}")
+
+    # the chunk queries of `flask advance-appointments`, as the job runs them
+    from src.appointments.lifecycle import advance_appointments
+
+    route = "flask advance-appointments"
+    with app.app_context():
+        advance_appointments(chunk_size=SEED_ROWS_PER_DOCTOR)
+    event.remove(engine, "before_cursor_execute", capture)
+
+    failures = 0
+    seen = set()
+    with engine.connect() as connection:
+        for route, statement, params in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            lines, full_scan = explain(connection, statement, params)
+            unfiltered = re.search(r"\bWHERE\b", statement, re.I) is None
+            if full_scan and not unfiltered:
+                failures += 1
+                marker = "FAIL"
+            elif full_scan:
+                marker = "scan"
+            else:
+                marker = "ok"
+            print(f"[{marker}] {route}")
+            print("       " + " ".join(statement.split()))
+            for line in lines:
+                print(f"         {line}")
+
+    print(f"\n{len(seen)} distinct statements, {failures} full scan(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
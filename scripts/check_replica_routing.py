@@ -0,0 +1,132 @@
+"""Check where statements go with a read replica configured, using two SQLite
+files: the primary, and a copy of it taken after seeding as the replica.
+
+The copy never catches up, so it stands in for a lagging replica: a read that
+sees a row written after seeding was answered by the primary.
+
+    python -m scripts.check_replica_routing
+
+Checks that GETs read from the replica, writes go to the primary, the writer
+is pinned to the primary for ``DB_READ_YOUR_WRITES_SECONDS`` while everyone
+else keeps reading the replica, and ``@reads_primary`` views stay on the
+primary.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import event
+
+from scripts.check_query_plans import seed
+from src.app import create_app, db
+from src.helpers.jwt_config import token_claims
+
+PIN_SECONDS = 1
+
+
+class EngineLog:
+    """Names of the engines (``primary``, ``replica0``) that ran statements."""
+
+    def __init__(self, engines):
+        self.used = set()
+        for key, engine in engines.items():
+            event.listen(engine, "before_cursor_execute", self._listener(key))
+
+    def _listener(self, key):
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.used.add(key or "primary")
+
+        return record
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    primary = os.path.join(directory, "primary.db")
+    replica = os.path.join(directory, "replica.db")
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}"})
+    with app.app_context():
+        db.create_all()
+        people = seed()
+        tokens = {
+            role: create_access_token(
+                identity=str(user.id), additional_claims=token_claims(user)
+            )
+            for role, user in people.items()
+        }
+        refresh = create_refresh_token(
+            identity=str(people["client"].id),
+            additional_claims=token_claims(people["client"]),
+        )
+        doctor_id = people["doctor"].id
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}",
+            "SQLALCHEMY_REPLICA_URIS": [f"sqlite:///{replica}"],
+            "DB_READ_YOUR_WRITES_SECONDS": PIN_SECONDS,
+        }
+    )
+    with app.app_context():
+        log = EngineLog(db.engines)
+    client = app.test_client()
+
+    def call(role, method, url, token=None, **kwargs):
+        log.used.clear()
+        headers = {"Authorization": f"Bearer {token or tokens[role]}"}
+        response = client.open(url, method=method, headers=headers, **kwargs)
+        response.get_data()
+        return response, set(log.used)
+
+    def doctor_rows(role):
+        response, used = call(role, "GET", "/availability/")
+        rows = [row for row in response.get_json() if row["doctor_id"] == doctor_id]
+        return len(rows), used
+
+    seeded, _ = doctor_rows("admin")
+    slot = datetime(2030, 1, 1, 9).isoformat()
+    results = []
+
+    def check(name, ok):
+        results.append(ok)
+        print(f"[{'ok' if ok else 'FAIL'}]{' ' * (3 if ok else 1)}{name}")
+
+    _, used = call("client", "GET", "/users/doctors")
+    check("GET reads from the replica", used == {"replica0"})
+
+    response, used = call(
+        "doctor",
+        "POST",
+        "/availability/",
+        json={"doctor_id": doctor_id, "date_time": slot},
+    )
+    check(
+        "POST writes to the primary",
+        response.status_code in (200, 201) and used == {"primary"},
+    )
+
+    count, used = doctor_rows("doctor")
+    check("the writer reads its write", count == seeded + 1 and used == {"primary"})
+
+    count, used = doctor_rows("admin")
+    check("others read the replica", count == seeded and used == {"replica0"})
+
+    _, used = call("client", "GET", "/auth/refresh", token=refresh)
+    check("@reads_primary view reads the primary", used == {"primary"})
+
+    time.sleep(PIN_SECONDS + 0.5)
+    count, used = doctor_rows("doctor")
+    check("the pin expires", count == seeded and used == {"replica0"})
+
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
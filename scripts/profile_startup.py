@@ -0,0 +1,82 @@
+"""Where a worker's startup time goes: imports, grouped by package, and
+``create_app``.
+
+Runs ``python -X importtime -c "import run"`` in a fresh interpreter, sums the
+self time of every imported module under its top-level package and prints the
+heaviest packages and ``src`` modules, then times ``create_app`` on its own.
+
+    python -m scripts.profile_startup
+    python -m scripts.profile_startup --top 20
+
+Without ``--database-url`` (or ``DATABASE_URL``) the app is pointed at an
+in-memory SQLite database; nothing connects to it at startup either way.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+TIMER = (
+    "import time; started = time.perf_counter(); import run; "
+    "print(round((time.perf_counter() - started) * 1000, 1))"
+)
+
+
+def import_times(database_url):
+    """Self time in microseconds of every module imported by ``import run``,
+    and the wall time of that import in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", TIMER],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "DATABASE_URL": database_url},
+    )
+    modules = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        modules[name.strip()] += int(self_us)
+    return modules, float(result.stdout.split()[-1])
+
+
+def create_app_ms(database_url):
+    from src.app import create_app
+
+    started = time.perf_counter()
+    create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument(
+        "--database-url", default=os.getenv("DATABASE_URL", "sqlite://")
+    )
+    args = parser.parse_args(argv)
+
+    modules, total = import_times(args.database_url)
+    packages = Counter()
+    for name, self_us in modules.items():
+        packages[name.split(".")[0]] += self_us
+
+    print(f"import run: {total:.1f}ms wall, {len(modules)} modules\n")
+    print(f"{'package':32} {'self':>9}")
+    for name, self_us in packages.most_common(args.top):
+        print(f"{name:32} {self_us / 1000:7.1f}ms")
+
+    print(f"\n{'src module':32} {'self':>9}")
+    own = Counter({name: us for name, us in modules.items() if name.startswith("src")})
+    for name, self_us in own.most_common(args.top):
+        print(f"{name:32} {self_us / 1000:7.1f}ms")
+
+    print(f"\ncreate_app: {create_app_ms(args.database_url):.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import case, delete, func, insert, literal, or_, select, union_all
+
+from src.admin.models import DoctorDailyStats
+from src.app import db
+from src.appointments.models import Appointment
+from src.availability.models import Availability, AvailabilityRule
+from src.availability.slots import rule_slot_starts
+
+COUNTERS = ("appointments", "canceled", "slots")
+
+
+def _upsert_statement():
+    """INSERT of one stats row that adds to the row if it already exists."""
+    table = DoctorDailyStats.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+        statement = dialect_insert(table)
+        return statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in COUNTERS}
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    statement = dialect_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=["doctor_id", "day"],
+        set_={name: table.c[name] + statement.excluded[name] for name in COUNTERS},
+    )
+
+
+def record_daily_stats(counter, added=(), removed=()):
+    """Count the ``(doctor_id, date_time)`` pairs in ``added`` into, and the
+    ones in ``removed`` out of, ``counter`` of their doctor's day.
+
+    One upsert per call however many days it touches; call it before the
+    commit of the write it accounts for, so the rollup moves with the rows.
+    """
+    deltas = Counter()
+    for doctor_id, date_time in added:
+        deltas[doctor_id, date_time.date()] += 1
+    for doctor_id, date_time in removed:
+        deltas[doctor_id, date_time.date()] -= 1
+    rows = [
+        {
+            "doctor_id": doctor_id,
+            "day": day,
+            **{name: delta if name == counter else 0 for name in COUNTERS},
+        }
+        for (doctor_id, day), delta in sorted(deltas.items())
+        if delta
+    ]
+    if rows:
+        db.session.execute(_upsert_statement(), rows)
+
+
+def backfill_daily_stats(first=None, last=None):
+    """Rebuild the stats of days ``first`` to ``last`` (inclusive; all days
+    when omitted) from the appointments and availability tables with one
+    DELETE and one INSERT ... SELECT. Returns the rows written; the caller
+    commits.
+    """
+    appointment_day = func.date(Appointment.date_time)
+    availability_day = func.date(Availability.date_time)
+    stats_range, appointment_range, availability_range = [], [], []
+    if first is not None:
+        start = datetime.combine(first, time.min)
+        stats_range.append(DoctorDailyStats.day >= first)
+        appointment_range.append(Appointment.date_time >= start)
+        availability_range.append(Availability.date_time >= start)
+    if last is not None:
+        end = datetime.combine(last + timedelta(days=1), time.min)
+        stats_range.append(DoctorDailyStats.day <= last)
+        appointment_range.append(Appointment.date_time < end)
+        availability_range.append(Availability.date_time < end)
+
+    booked = (
+        select(
+            Appointment.doctor_id.label("doctor_id"),
+            appointment_day.label("day"),
+            func.count().label("appointments"),
+            func.sum(case((Appointment.status == "canceled", 1), else_=0)).label(
+                "canceled"
+            ),
+            literal(0).label("slots"),
+        )
+        .where(*appointment_range)
+        .group_by(Appointment.doctor_id, appointment_day)
+    )
+    published = (
+        select(
+            Availability.doctor_id,
+            availability_day,
+            literal(0),
+            literal(0),
+            func.count(),
+        )
+        .where(*availability_range)
+        .group_by(Availability.doctor_id, availability_day)
+    )
+    both = union_all(booked, published).subquery()
+
+    db.session.execute(delete(DoctorDailyStats).where(*stats_range))
+    result = db.session.execute(
+        insert(DoctorDailyStats).from_select(
+            ["doctor_id", "day", *COUNTERS],
+            select(
+                both.c.doctor_id,
+                both.c.day,
+                *(func.sum(both.c[name]) for name in COUNTERS),
+            ).group_by(both.c.doctor_id, both.c.day),
+        )
+    )
+    return result.rowcount
+
+
+def rule_slot_counts(first, last, doctor_id=None):
+    """Slots that recurring rules open on days ``first`` to ``last``, by
+    ``(doctor_id, day)``.
+
+    Rules may be open-ended, so the rollup cannot hold their slots; they are
+    expanded here instead, as for the free-slot search. A rule slot that
+    starts at the same time as a stored availability slot counts once.
+    """
+    window_start = datetime.combine(first, time.min)
+    window_end = datetime.combine(last + timedelta(days=1), time.min)
+    statement = select(AvailabilityRule).where(
+        AvailabilityRule.start_date <= last,
+        or_(AvailabilityRule.end_date.is_(None), AvailabilityRule.end_date >= first),
+    )
+    if doctor_id is not None:
+        statement = statement.where(AvailabilityRule.doctor_id == doctor_id)
+    rules = db.session.scalars(statement).all()
+    if not rules:
+        return Counter()
+
+    stored = set(
+        db.session.execute(
+            select(Availability.doctor_id, Availability.date_time).where(
+                Availability.doctor_id.in_({rule.doctor_id for rule in rules}),
+                Availability.date_time >= window_start,
+                Availability.date_time < window_end,
+            )
+        ).tuples()
+    )
+    starts = {
+        (rule.doctor_id, start)
+        for rule in rules
+        for start in rule_slot_starts(rule, window_start, window_end)
+    }
+    return Counter((doctor, start.date()) for doctor, start in starts - stored)
+
+
+def _rates(row):
+    appointments, canceled, slots = (int(row[name] or 0) for name in COUNTERS)
+    return {
+        "appointments": appointments,
+        "canceled": canceled,
+        "slots": slots,
+        "cancellation_rate": canceled / appointments if appointments else None,
+        # share of the published slots taken by appointments still standing
+        "utilization": (appointments - canceled) / slots if slots else None,
+    }
+
+
+def utilization(first, last, by="day", doctor_id=None):
+    """Booking, cancellation and utilization figures of days ``first`` to
+    ``last`` from the rollup and the recurring rules, one entry per day,
+    doctor or doctor and day (``by``), plus the totals of the range."""
+    stats = DoctorDailyStats
+    keys = {
+        "day": [stats.day],
+        "doctor": [stats.doctor_id],
+        "doctor_day": [stats.doctor_id, stats.day],
+    }[by]
+    statement = (
+        select(
+            *keys, *(func.sum(stats.__table__.c[name]).label(name) for name in COUNTERS)
+        )
+        .where(stats.day >= first, stats.day <= last)
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    if doctor_id is not None:
+        statement = statement.where(stats.doctor_id == doctor_id)
+
+    entries = {}
+    for row in db.session.execute(statement).mappings():
+        key = tuple(row[column.key] for column in keys)
+        entries[key] = {name: int(row[name] or 0) for name in COUNTERS}
+    for (doctor, day), count in rule_slot_counts(first, last, doctor_id).items():
+        key = {"day": (day,), "doctor": (doctor,), "doctor_day": (doctor, day)}[by]
+        entries.setdefault(key, dict.fromkeys(COUNTERS, 0))["slots"] += count
+
+    rows, totals = [], Counter()
+    for key, counts in sorted(entries.items()):
+        entry = dict(zip((column.key for column in keys), key))
+        if "day" in entry:
+            entry["day"] = entry["day"].isoformat()
+        entry.update(_rates(counts))
+        totals.update(counts)
+        rows.append(entry)
+    return rows, _rates(totals)
@@ -0,0 +1,181 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, select, update
+
+from src.admin.analytics import record_daily_stats
+from src.app import db
+from src.appointments.calendar import bump_calendars, bump_calendars_of
+from src.appointments.models import APPOINTMENT_MINUTES, FINAL_STATUSES, Appointment
+from src.helpers.conditional import DOCTORS, USERS, bump_version
+from src.helpers.revocation import publish_on_commit
+from src.users.models import User
+
+# Ids per IN (...) list, so statements stay small on every backend.
+IN_CHUNK_SIZE = 1000
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[i : i + IN_CHUNK_SIZE]
+
+
+class ReassignConflict(Exception):
+    """The new doctor is busy at some of the times being moved to them."""
+
+    def __init__(self, appointment_ids):
+        super().__init__(
+            f"{len(appointment_ids)} appointment(s) clash with the new doctor's"
+            " schedule"
+        )
+        self.appointment_ids = appointment_ids
+
+
+def set_blocked(user_ids, blocked):
+    """Block or unblock ``user_ids`` with set-based UPDATEs.
+
+    Blocking also bumps the security version of every user it changes, which
+    revokes their tokens at commit. Returns the ``(id, role)`` rows that
+    changed and the ids that do not exist. The caller commits.
+    """
+    rows = []
+    for chunk in _chunks(user_ids):
+        rows += db.session.execute(
+            select(User.id, User.role, User.blocked, User.security_version)
+            .where(User.id.in_(chunk))
+            .with_for_update()
+        ).all()
+    missing = sorted(set(user_ids) - {row.id for row in rows})
+    changed = [row for row in rows if bool(row.blocked) != blocked]
+    if not changed:
+        return [], missing
+
+    values = {"blocked": blocked}
+    if blocked:
+        values["security_version"] = User.security_version + 1
+    for chunk in _chunks(row.id for row in changed):
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(chunk))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    if blocked:
+        for row in changed:
+            publish_on_commit(row.id, (row.security_version or 0) + 1)
+
+    bump_version(USERS)
+    if any(row.role == "doctor" for row in changed):
+        bump_version(DOCTORS)
+    return [(row.id, row.role) for row in changed], missing
+
+
+def blocked_doctor_ids(user_ids):
+    """The ids among ``user_ids`` that belong to blocked doctors."""
+    found = []
+    for chunk in _chunks(user_ids):
+        found += db.session.scalars(
+            select(User.id).where(
+                User.id.in_(chunk), User.role == "doctor", User.blocked.is_(True)
+            )
+        ).all()
+    return sorted(found)
+
+
+def _cancel(condition):
+    bump_calendars_of(condition)
+    record_daily_stats(
+        "canceled",
+        added=db.session.execute(
+            select(Appointment.doctor_id, Appointment.date_time).where(condition)
+        ).all(),
+    )
+    # a Core UPDATE skips the @validates hook that releases the slot
+    return db.session.execute(
+        update(Appointment)
+        .where(condition)
+        .values(status="canceled", holds_slot=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def release_appointments(
+    doctor_ids, action, reassign_to=None, on_conflict="abort", now=None
+):
+    """Cancel, or move to doctor ``reassign_to``, every future appointment of
+    ``doctor_ids`` that is not canceled or completed yet.
+
+    Reassigned appointments must not overlap the new doctor's bookings or
+    each other (the rule ``create_appointment`` enforces); with
+    ``on_conflict="abort"`` a clash raises ``ReassignConflict``, with
+    ``"cancel"`` the clashing ones are canceled instead. Returns the counts.
+    The caller commits.
+    """
+    now = now or datetime.utcnow()
+    future = [Appointment.date_time > now, Appointment.status.not_in(FINAL_STATUSES)]
+
+    if action == "cancel":
+        canceled = sum(
+            _cancel(and_(Appointment.doctor_id.in_(chunk), *future))
+            for chunk in _chunks(doctor_ids)
+        )
+        return {"canceled": canceled, "reassigned": 0}
+
+    moving = []
+    for chunk in _chunks(doctor_ids):
+        moving += db.session.execute(
+            select(Appointment.id, Appointment.doctor_id, Appointment.date_time)
+            .where(Appointment.doctor_id.in_(chunk), *future)
+            .with_for_update()
+        ).all()
+    if not moving:
+        return {"canceled": 0, "reassigned": 0}
+    moving.sort(key=lambda row: (row.date_time, row.id))
+
+    # create_appointment serializes a doctor's bookings on their users row;
+    # hold it so none can slip in between this check and the UPDATE below
+    db.session.execute(select(User.id).where(User.id == reassign_to).with_for_update())
+    length = timedelta(minutes=APPOINTMENT_MINUTES)
+    busy = sorted(
+        db.session.scalars(
+            select(Appointment.date_time)
+            .where(
+                Appointment.doctor_id == reassign_to,
+                Appointment.holds_slot.is_not(None),
+                Appointment.date_time > moving[0].date_time - length,
+                Appointment.date_time < moving[-1].date_time + length,
+            )
+            .with_for_update()
+        )
+    )
+    fits, clashes, last = [], [], None
+    for row in moving:
+        i = bisect_right(busy, row.date_time - length)
+        taken = i < len(busy) and busy[i] < row.date_time + length
+        if taken or (last is not None and last > row.date_time - length):
+            clashes.append(row.id)
+        else:
+            fits.append(row)
+            last = row.date_time
+
+    if clashes and on_conflict == "abort":
+        raise ReassignConflict(clashes)
+    canceled = sum(_cancel(Appointment.id.in_(chunk)) for chunk in _chunks(clashes))
+    reassigned = 0
+    if fits:
+        bump_calendars([reassign_to])
+        record_daily_stats(
+            "appointments",
+            added=[(reassign_to, row.date_time) for row in fits],
+            removed=[(row.doctor_id, row.date_time) for row in fits],
+        )
+    for chunk in _chunks(row.id for row in fits):
+        bump_calendars_of(Appointment.id.in_(chunk))
+        reassigned += db.session.execute(
+            update(Appointment)
+            .where(Appointment.id.in_(chunk))
+            .values(doctor_id=reassign_to)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return {"canceled": canceled, "reassigned": reassigned}
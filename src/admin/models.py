@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer
+
+from src.app import db
+
+# Longest range one analytics request may cover.
+MAX_ANALYTICS_DAYS = 366
+
+
+class DoctorDailyStats(db.Model):
+    """Per doctor and calendar day: appointments booked for that day, how
+    many of them were canceled, and stored availability slots published.
+    Slots of recurring rules are not stored; ``utilization`` adds them.
+
+    Maintained by the write routes through ``src.admin.analytics`` in the
+    same transaction as the rows they count; ``flask backfill-daily-stats``
+    rebuilds it from the raw tables.
+    """
+
+    __tablename__ = "doctor_daily_stats"
+    __table_args__ = (Index("ix_doctor_daily_stats_day", "day"),)
+
+    doctor_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)
+    appointments = Column(Integer, nullable=False, default=0)
+    canceled = Column(Integer, nullable=False, default=0)
+    slots = Column(Integer, nullable=False, default=0)
+
+
+# ✅ Query parameters for the utilization analytics
+class AnalyticsQuery(BaseModel):
+    from_: date = Field(..., alias="from", description="First day, inclusive")
+    to: date = Field(..., description="Last day, inclusive")
+    doctor_id: Optional[int] = Field(None, gt=0, description="Only this doctor's")
+    by: Literal["day", "doctor", "doctor_day"] = Field(
+        "day", description="One row per day, per doctor, or per doctor and day"
+    )
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.to < self.from_:
+            raise ValueError("'to' must not be before 'from'")
+        if (self.to - self.from_).days >= MAX_ANALYTICS_DAYS:
+            raise ValueError(f"At most {MAX_ANALYTICS_DAYS} days per request")
+        return self
@@ -1,20 +1,43 @@
-from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import current_user, jwt_required
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.pool import QueuePool
 
+from src.admin.analytics import utilization
+from src.admin.bulk import (
+    ReassignConflict,
+    blocked_doctor_ids,
+    release_appointments,
+    set_blocked,
+)
+from src.admin.models import AnalyticsQuery
 from src.app import db
-from src.users.models import User
+from src.appointments.models import DoctorAppointmentsBulk
+from src.helpers.admission import get_admission
+from src.helpers.cache import cached, get_cache
+from src.helpers.conditional import DOCTORS, USERS, bump_version
+from src.helpers.db import pool_stats
+from src.helpers.profiler import get_profiler, query_budget
+from src.helpers.revocation import revoke_user_tokens
+from src.helpers.streaming import stream_query, wants_stream
+from src.users.models import USER_PROJECTION, User, UserBulkBlock
 from src.utils import role_required
 
 admin = Blueprint("admin", __name__)
 
 
 @admin.get("/users/")
+@query_budget(3)
 @jwt_required()
 @role_required(["admin"])
+@cached(USERS)
 def get_all_users():
     """Fetch all users."""
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    query = USER_PROJECTION.query()
+    if wants_stream():
+        return stream_query(query.order_by(User.id), USER_PROJECTION.to_dict)
+    return jsonify([USER_PROJECTION.to_dict(row) for row in query])
 
 
 @admin.put("/users/block/<int:user_id>")
@@ -28,6 +51,235 @@ def block_unblock_user(user_id):
         return jsonify({"error": "User not found"}), 404
 
     user.blocked = not user.blocked
+    # Build the message before commit expires the instance and forces a reload
+    message = (
+        f"User {user.email} has been {'blocked' if user.blocked else 'unblocked'}."
+    )
+    if user.blocked:
+        # their tokens stop working now, not when they expire
+        revoke_user_tokens(user)
+    bump_version(USERS)
+    if user.role == "doctor":
+        bump_version(DOCTORS)
     db.session.commit()
-    status = "blocked" if user.blocked else "unblocked"
-    return jsonify({"message": f"User {user.email} has been {status}."})
+    return jsonify({"message": message})
+
+
+def _reassign_target_error(action):
+    """Why ``action`` cannot move appointments to its ``reassign_to``, if so.
+    Locks the doctor's row until the bulk transaction ends, so they cannot be
+    blocked or lose the role meanwhile."""
+    if action is None or action.action != "reassign":
+        return None
+    doctor = db.session.get(User, action.reassign_to, with_for_update=True)
+    if not doctor or doctor.role != "doctor" or doctor.blocked:
+        return "'reassign_to' must be an active doctor"
+    return None
+
+
+def _finish_bulk(params, run):
+    """Run ``run()`` in one transaction; commit it, or roll it back for a dry
+    run, and answer with its counts."""
+    try:
+        result = run()
+    except ReassignConflict as e:
+        db.session.rollback()
+        return (
+            jsonify({"error": str(e), "appointment_ids": e.appointment_ids[:100]}),
+            409,
+        )
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Appointments changed meanwhile, try again"}), 409
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"error": "Bulk update failed"}), 500
+
+    if params.dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return jsonify({"dry_run": params.dry_run, **result})
+
+
+@admin.put("/users/block")
+@jwt_required()
+@role_required(["admin"])
+def bulk_block_users():
+    """Block or unblock many users at once, optionally cancelling or
+    reassigning the future appointments of the blocked doctors among them."""
+    try:
+        params = UserBulkBlock(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    user_ids = sorted(set(params.user_ids))
+    if params.appointments is not None and not params.blocked:
+        return jsonify({"error": "'appointments' only applies when blocking"}), 400
+    if params.blocked and current_user.id in user_ids:
+        return jsonify({"error": "You cannot block yourself"}), 400
+    target_error = _reassign_target_error(params.appointments)
+    if target_error:
+        return jsonify({"error": target_error}), 400
+    if params.appointments and params.appointments.reassign_to in user_ids:
+        return jsonify({"error": "'reassign_to' is being blocked"}), 400
+
+    def run():
+        changed, missing = set_blocked(user_ids, params.blocked)
+        result = {
+            "users": {
+                "changed": len(changed),
+                "unchanged": len(user_ids) - len(changed) - len(missing),
+                "missing": missing,
+            }
+        }
+        if params.appointments is not None:
+            action = params.appointments
+            result["appointments"] = release_appointments(
+                blocked_doctor_ids(user_ids),
+                action.action,
+                reassign_to=action.reassign_to,
+                on_conflict=action.on_conflict,
+            )
+        return result
+
+    return _finish_bulk(params, run)
+
+
+@admin.put("/doctors/appointments")
+@jwt_required()
+@role_required(["admin"])
+def bulk_release_appointments():
+    """Cancel or reassign the future appointments of blocked doctors."""
+    try:
+        params = DoctorAppointmentsBulk(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    target_error = _reassign_target_error(params)
+    if target_error:
+        return jsonify({"error": target_error}), 400
+
+    def run():
+        doctor_ids = blocked_doctor_ids(sorted(set(params.doctor_ids)))
+        # only blocked doctors' patients are moved or told to rebook
+        skipped = sorted(set(params.doctor_ids) - set(doctor_ids))
+        counts = release_appointments(
+            doctor_ids,
+            params.action,
+            reassign_to=params.reassign_to,
+            on_conflict=params.on_conflict,
+        )
+        return {"doctors": len(doctor_ids), "skipped": skipped, "appointments": counts}
+
+    return _finish_bulk(params, run)
+
+
+# ✅ Bookings, cancellations and slot utilization from the daily rollup
+@admin.get("/analytics")
+@query_budget(3)
+@jwt_required()
+@role_required(["admin"])
+def get_analytics():
+    try:
+        params = AnalyticsQuery(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows, totals = utilization(
+        params.from_, params.to, by=params.by, doctor_id=params.doctor_id
+    )
+    return jsonify(
+        {
+            "from": params.from_.isoformat(),
+            "to": params.to.isoformat(),
+            "by": params.by,
+            "rows": rows,
+            "totals": totals,
+        }
+    )
+
+
+@admin.get("/db/pool")
+@jwt_required()
+@role_required(["admin"])
+def get_pool_stats():
+    """Connection pool gauges of the worker that serves this request."""
+    pool = db.engine.pool
+    stats = {"pool": pool.__class__.__name__, **pool_stats.to_dict()}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(), in_use=pool.checkedout(), overflow=pool.overflow()
+        )
+    return jsonify(stats)
+
+
+@admin.get("/sql-profile")
+@jwt_required()
+@role_required(["admin"])
+def get_sql_profile():
+    """Per-endpoint SQL statistics collected by this worker (SQL_PROFILER=1)."""
+    profiler = get_profiler()
+    if profiler is None or not current_app.config["SQL_PROFILER"]:
+        return jsonify({"error": "SQL profiler is disabled"}), 404
+    return jsonify(profiler.to_dict())
+
+
+@admin.delete("/sql-profile")
+@jwt_required()
+@role_required(["admin"])
+def reset_sql_profile():
+    """Clear this worker's SQL statistics."""
+    profiler = get_profiler()
+    if profiler is None or not current_app.config["SQL_PROFILER"]:
+        return jsonify({"error": "SQL profiler is disabled"}), 404
+    profiler.reset()
+    return jsonify({"message": "SQL profile cleared"})
+
+
+@admin.get("/cache")
+@jwt_required()
+@role_required(["admin"])
+def get_cache_stats():
+    """Read cache size and hit/miss/eviction counters of the answering worker."""
+    cache = get_cache()
+    if cache is None:
+        return jsonify({"error": "Cache is disabled"}), 404
+    return jsonify(cache.to_dict())
+
+
+@admin.delete("/cache")
+@jwt_required()
+@role_required(["admin"])
+def clear_cache():
+    """Drop every cached response and reset this worker's counters."""
+    cache = get_cache()
+    if cache is None:
+        return jsonify({"error": "Cache is disabled"}), 404
+    cache.clear()
+    cache.stats.reset()
+    return jsonify({"message": "Cache cleared"})
+
+
+@admin.get("/admission")
+@jwt_required()
+@role_required(["admin"])
+def get_admission_stats():
+    """Limits, requests in flight and admitted/rejected counters per limited
+    endpoint, shared by all workers of a ``--preload`` master."""
+    admission = get_admission()
+    if admission is None:
+        return jsonify({"error": "Admission control is disabled"}), 404
+    return jsonify(admission.to_dict())
+
+
+@admin.delete("/admission")
+@jwt_required()
+@role_required(["admin"])
+def reset_admission_stats():
+    """Zero the admitted/rejected counters."""
+    admission = get_admission()
+    if admission is None:
+        return jsonify({"error": "Admission control is disabled"}), 404
+    admission.reset()
+    return jsonify({"message": "Admission counters cleared"})
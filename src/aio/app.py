@@ -0,0 +1,72 @@
+import os
+
+from quart import Quart, current_app, g, jsonify
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from src.helpers.db import database_url, engine_options
+from src.helpers.jwt_config import jwt_secret_key
+
+# asyncio drivers standing in for the sync ones of the WSGI app
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url):
+    """``url`` with its driver swapped for the asyncio one."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def create_async_app(config=None):
+    """ASGI app serving the read endpoints with async views and an async
+    SQLAlchemy engine. Writes stay on the WSGI app (``run.py``)."""
+    app = Quart(__name__)
+    if config:
+        app.config.update(config)
+
+    app.config.setdefault(
+        "SQLALCHEMY_DATABASE_URI", os.getenv("ASYNC_DATABASE_URL", database_url())
+    )
+    app.config.setdefault("JWT_SECRET_KEY", jwt_secret_key())
+    url = async_database_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    options = engine_options(url)
+    # async engines bring their own asyncio-aware pool class
+    options.pop("poolclass", None)
+    engine = create_async_engine(url, **options)
+    app.extensions["async_engine"] = engine
+    app.extensions["async_session"] = async_sessionmaker(engine, expire_on_commit=False)
+
+    from src.helpers.revocation import init_revocation
+
+    init_revocation(app)
+
+    @app.teardown_appcontext
+    async def close_session(exception):
+        session = g.pop("db_session", None)
+        if session is not None:
+            await session.close()
+
+    @app.after_serving
+    async def dispose_engine():
+        await engine.dispose()
+
+    # ✅ Same JSON error body as the WSGI app
+    @app.errorhandler(HTTPException)
+    async def handle_http_exception(e):
+        return jsonify({"error": e.description}), e.code
+
+    from src.aio.routes import appointments, auth, availability, users
+
+    app.register_blueprint(auth, url_prefix="/auth")
+    app.register_blueprint(appointments, url_prefix="/appointments")
+    app.register_blueprint(availability, url_prefix="/availability")
+    app.register_blueprint(users, url_prefix="/users")
+    return app
+
+
+def get_session():
+    """The request's ``AsyncSession``, closed when the app context ends."""
+    if "db_session" not in g:
+        g.db_session = current_app.extensions["async_session"]()
+    return g.db_session
@@ -0,0 +1,86 @@
+import asyncio
+from functools import wraps
+
+import jwt
+from quart import current_app, g, jsonify, request
+
+from src.aio.app import get_session
+from src.helpers.jwt_config import TokenUser
+from src.helpers.revocation import RevocationStoreUnavailable, revoked_by_user
+from src.users.models import User
+
+
+def login_required(roles=None):
+    """Async counterpart of ``@jwt_required()`` + ``@role_required(roles)``.
+
+    Verifies the access tokens issued by the WSGI app against the same
+    revocation store and puts the caller into ``g.user`` (a ``TokenUser``
+    with only ``id`` and ``role``); with ``roles=None`` any signed-in user
+    passes.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            header = request.headers.get("Authorization")
+            if not header:
+                return jsonify({"msg": "Missing Authorization Header"}), 401
+            scheme, _, token = header.partition(" ")
+            if scheme != "Bearer" or not token:
+                return (
+                    jsonify(
+                        {
+                            "msg": "Missing 'Bearer' type in 'Authorization' header."
+                            " Expected 'Authorization: Bearer <JWT>'"
+                        }
+                    ),
+                    401,
+                )
+            try:
+                claims = jwt.decode(
+                    token, current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"]
+                )
+            except jwt.ExpiredSignatureError:
+                return jsonify({"msg": "Token has expired"}), 401
+            except jwt.InvalidTokenError as e:
+                return jsonify({"msg": str(e)}), 422
+            if claims.get("type", "access") != "access" or "sub" not in claims:
+                return jsonify({"msg": "Only non-refresh tokens are allowed"}), 422
+
+            user = None
+            store = current_app.extensions["revocation"]
+            try:
+                if store.backend == "memory":
+                    revoked = store.is_revoked(claims)
+                else:
+                    # keep network round trips off the event loop
+                    revoked = await asyncio.to_thread(store.is_revoked, claims)
+            except RevocationStoreUnavailable:
+                user = await get_session().get(User, int(claims["sub"]))
+                revoked = revoked_by_user(claims, user)
+            if revoked:
+                return jsonify({"msg": "Token has been revoked"}), 401
+
+            if user is None and "role" in claims:
+                user = TokenUser(int(claims["sub"]), claims["role"])
+            elif user is None:
+                # tokens issued before the role claim existed
+                user = await get_session().get(User, int(claims["sub"]))
+            if not user:
+                return jsonify({"error": "User not found"}), 404
+
+            if roles is not None:
+                if user.blocked:
+                    return (
+                        jsonify({"error": "Your account is blocked. Contact Admin."}),
+                        403,
+                    )
+                if user.role not in roles:
+                    return jsonify({"error": "Unauthorized access"}), 403
+
+            g.user = user
+            return await view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
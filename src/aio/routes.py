@@ -0,0 +1,176 @@
+"""Async read endpoints, same URLs, parameters and bodies as the WSGI blueprints.
+
+The query building (filters, keyset pagination, ``?expand=``) is shared with
+the sync routes; only the execution is awaited.
+"""
+
+from pydantic import ValidationError
+from quart import Blueprint, g, jsonify, request
+from sqlalchemy import func, select
+
+from src.aio.app import get_session
+from src.aio.auth import login_required
+from src.appointments.models import Appointment, AppointmentExpand, AppointmentQuery
+from src.appointments.routes import _filtered_appointments
+from src.availability.models import Availability
+from src.helpers.pagination import InvalidCursor, keyset_page, keyset_select
+from src.users.models import DoctorSearch, User
+from src.users.routes import _filtered_doctors
+
+auth = Blueprint("auth", __name__)
+users = Blueprint("users", __name__)
+availability = Blueprint("availability", __name__)
+appointments = Blueprint("appointments", __name__)
+
+
+async def _keyset_paginate(statement, columns, cursor, limit):
+    session = get_session()
+    rows = (
+        await session.scalars(keyset_select(statement, columns, cursor, limit))
+    ).all()
+    return keyset_page(rows, columns, limit)
+
+
+@auth.get("/user/me")
+@login_required()
+async def get_current_user():
+    user = await get_session().get(User, g.user.id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({"user": user.to_dict()})
+
+
+@users.get("/")
+@login_required(["admin"])
+async def get_all_users():
+    users = await get_session().scalars(select(User).filter_by(role="client"))
+    return jsonify({"users": [user.to_dict() for user in users]}), 200
+
+
+@users.get("/doctors")
+@login_required(["admin", "client"])
+async def get_all_doctors():
+    try:
+        params = DoctorSearch(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"message": e.errors()}), 400
+
+    order = (User.last_name, User.first_name, User.id)
+    statement = _filtered_doctors(select(User).where(User.role == "doctor"), params)
+    try:
+        doctors, next_cursor = await _keyset_paginate(
+            statement, order, params.cursor, params.limit
+        )
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+
+    return jsonify(
+        {
+            "doctors": [doctor.to_dict() for doctor in doctors],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@users.get("/<int:user_id>")
+@login_required(["admin", "doctor", "client"])
+async def get_user(user_id):
+    user = await get_session().get(User, user_id)
+
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+    return jsonify({"user": user.to_dict()})
+
+
+@availability.get("/")
+@login_required(["admin", "doctor", "client"])
+async def get_all_availabilities():
+    statement = select(Availability)
+    if g.user.role == "doctor":
+        # doctor sees only their availability
+        statement = statement.filter_by(doctor_id=g.user.id)
+
+    availabilities_list = await get_session().scalars(
+        statement.order_by(Availability.id)
+    )
+    return jsonify([availability.to_dict() for availability in availabilities_list])
+
+
+@availability.get("/<int:availability_id>")
+@login_required(["admin", "doctor", "client"])
+async def get_availability(availability_id):
+    availability = await get_session().get(Availability, availability_id)
+
+    if not availability:
+        return jsonify({"error": "Availability not found"}), 404
+
+    # doctor can only access their own availability
+    if g.user.role == "doctor" and availability.doctor_id != g.user.id:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    return jsonify({"availability": availability.to_dict()})
+
+
+@appointments.get("/")
+@login_required(["admin", "doctor", "client"])
+async def get_all_appointments():
+    order = (Appointment.date_time, Appointment.id)
+    try:
+        params = AppointmentQuery(**request.args.to_dict())
+        statement = _filtered_appointments(g.user, params, select(Appointment)).options(
+            *Appointment.eager(params.expand)
+        )
+        appointments_list, next_cursor = await _keyset_paginate(
+            statement, order, params.cursor, params.limit
+        )
+    except (ValidationError, InvalidCursor) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(
+        {
+            "appointments": [
+                appointment.to_dict(params.expand) for appointment in appointments_list
+            ],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@appointments.get("/count")
+@login_required(["admin", "doctor", "client"])
+async def count_appointments():
+    try:
+        params = AppointmentQuery(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    statement = _filtered_appointments(
+        g.user, params, select(func.count(Appointment.id))
+    )
+    return jsonify({"count": await get_session().scalar(statement)})
+
+
+@appointments.get("/<int:appointment_id>")
+@login_required(["admin", "doctor", "client"])
+async def get_appointment(appointment_id):
+    try:
+        params = AppointmentExpand(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    appointment = await get_session().get(
+        Appointment, appointment_id, options=Appointment.eager(params.expand)
+    )
+
+    if not appointment:
+        return jsonify({"error": "Appointment not found"}), 404
+
+    # Authorization: doctor can only view their own appointments
+    if g.user.role == "doctor" and appointment.doctor_id != g.user.id:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    # client can only view their own appointments
+    if g.user.role == "client" and appointment.user_id != g.user.id:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    return jsonify({"appointment": appointment.to_dict(params.expand)})
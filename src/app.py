@@ -2,19 +2,43 @@ from flask import Flask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 
-from src.helpers.db import init_db
+from src.helpers.db import RoutingSession, init_db
+from src.helpers.json_provider import init_json
 from src.helpers.jwt_config import init_jwt
+from src.helpers.profiler import init_profiler
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
+    if config:
+        app.config.update(config)
     CORS(app)
+    init_json(app)
 
     init_db(app, db)
+    init_profiler(app, db)
     init_jwt(app)
 
+    from src.appointments.calendar import init_calendar
+    from src.appointments.lifecycle import init_lifecycle
+    from src.cli import init_cli
+    from src.helpers.admission import init_admission
+    from src.helpers.cache import init_cache
+    from src.helpers.revocation import init_revocation
+    from src.helpers.startup import init_warmup
+    from src.users.search import init_search
+
+    init_search(app)
+    init_cache(app)
+    init_revocation(app)
+    init_cli(app)
+    init_lifecycle(app)
+    init_calendar(app)
+    init_warmup(app)
+    init_admission(app)
+
     @app.route("/")
     def home():
         return {"message": "CORS is configured for Next.js!"}
@@ -0,0 +1,263 @@
+import hashlib
+import os
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import or_, select, update
+
+from src.app import db
+from src.appointments.models import (
+    APPOINTMENT_MINUTES,
+    RELEASED_STATUSES,
+    Appointment,
+)
+from src.availability.models import SLOT_MINUTES, Availability, AvailabilityRule
+from src.availability.slots import rule_slot_starts
+from src.users.models import User
+
+# Ids per IN (...) list when bumping many calendars at once.
+BUMP_CHUNK_SIZE = 1000
+
+# iCalendar lines are folded at 75 octets (RFC 5545, 3.1).
+_FOLD_AT = 75
+
+
+def init_calendar(app):
+    """Read the calendar feed settings: how many days before and after today
+    a feed covers, and how often subscribers are asked to poll."""
+    app.config.setdefault(
+        "CALENDAR_FEED_PAST_DAYS", int(os.getenv("CALENDAR_FEED_PAST_DAYS", 30))
+    )
+    app.config.setdefault(
+        "CALENDAR_FEED_FUTURE_DAYS", int(os.getenv("CALENDAR_FEED_FUTURE_DAYS", 180))
+    )
+    app.config.setdefault(
+        "CALENDAR_FEED_REFRESH_MINUTES",
+        int(os.getenv("CALENDAR_FEED_REFRESH_MINUTES", 60)),
+    )
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config["JWT_SECRET_KEY"], salt="calendar-feed")
+
+
+def feed_token(user_id, security_version):
+    """A signed, non-expiring token naming ``user_id``'s feed. It dies with
+    the user's tokens: blocking, a role change or deletion revokes it."""
+    return _serializer().dumps({"id": user_id, "sv": security_version})
+
+
+def load_feed_token(token):
+    """``(user_id, security_version)`` of a valid feed token, else None."""
+    try:
+        data = _serializer().loads(token)
+        return int(data["id"]), int(data["sv"])
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def bump_calendars(user_ids):
+    """Mark the feeds of ``user_ids`` as changed; call before the commit."""
+    user_ids = sorted(set(user_ids))
+    for i in range(0, len(user_ids), BUMP_CHUNK_SIZE):
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(user_ids[i : i + BUMP_CHUNK_SIZE]))
+            .values(calendar_version=User.calendar_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def bump_calendars_of(condition):
+    """Mark the feeds of both participants of every appointment matching
+    ``condition`` as changed, in one set-based UPDATE. Run it before the
+    statement that changes those appointments."""
+    db.session.execute(
+        update(User)
+        .where(
+            or_(
+                User.id.in_(select(Appointment.user_id).where(condition)),
+                User.id.in_(select(Appointment.doctor_id).where(condition)),
+            )
+        )
+        .values(calendar_version=User.calendar_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def feed_window(now=None):
+    """``[start, end)`` of the rolling window a feed covers, in whole days so
+    that it moves (and the ETag with it) once a day."""
+    today = (now or datetime.utcnow()).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    config = current_app.config
+    return (
+        today - timedelta(days=config["CALENDAR_FEED_PAST_DAYS"]),
+        today + timedelta(days=config["CALENDAR_FEED_FUTURE_DAYS"] + 1),
+    )
+
+
+def feed_etag(user, start):
+    """Changes with the user's calendar version and the window's first day."""
+    config = current_app.config
+    key = (
+        f"{user.id}:{user.calendar_version}:{start.date()}:"
+        f"{config['CALENDAR_FEED_PAST_DAYS']}:{config['CALENDAR_FEED_FUTURE_DAYS']}"
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _escape(text):
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _line(name, value):
+    line = f"{name}:{value}".encode()
+    if len(line) <= _FOLD_AT:
+        return line.decode() + "\r\n"
+    parts, start = [], 0
+    while start < len(line):
+        # continuation lines start with a space, which counts toward the limit
+        end = min(len(line), start + (_FOLD_AT if not parts else _FOLD_AT - 1))
+        while end < len(line) and (line[end] & 0xC0) == 0x80:
+            end -= 1  # never split a UTF-8 sequence
+        parts.append(line[start:end].decode())
+        start = end
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _stamp(value):
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _event(uid, start, minutes, summary, stamp, status=None, description=None):
+    lines = [
+        "BEGIN:VEVENT\r\n",
+        _line("UID", uid),
+        _line("DTSTAMP", stamp),
+        _line("DTSTART", _stamp(start)),
+        _line("DTEND", _stamp(start + timedelta(minutes=minutes))),
+        _line("SUMMARY", summary),
+    ]
+    if status is None:
+        # open slots do not make the doctor look busy
+        lines.append(_line("TRANSP", "TRANSPARENT"))
+    else:
+        lines.append(_line("STATUS", status))
+    if description:
+        lines.append(_line("DESCRIPTION", _escape(description)))
+    lines.append("END:VEVENT\r\n")
+    return "".join(lines)
+
+
+def _appointment_rows(user, start, end):
+    own = Appointment.doctor_id if user.role == "doctor" else Appointment.user_id
+    return db.session.execute(
+        select(
+            Appointment.id,
+            Appointment.date_time,
+            Appointment.status,
+            Appointment.client_requirements,
+        )
+        .where(
+            own == user.id, Appointment.date_time >= start, Appointment.date_time < end
+        )
+        .order_by(Appointment.date_time)
+        .execution_options(yield_per=500)
+    )
+
+
+def _open_slots(doctor_id, start, end, booked):
+    """Open slots of ``doctor_id`` in ``[start, end)`` as ``(uid, start,
+    minutes)``: stored availability and the slots of recurring rules (one
+    that starts with a stored slot counts once), less those overlapped by a
+    start in the sorted ``booked``, the overlap test ``create_appointment``
+    applies."""
+    stored = db.session.execute(
+        select(Availability.id, Availability.date_time).where(
+            Availability.doctor_id == doctor_id,
+            Availability.date_time >= start,
+            Availability.date_time < end,
+        )
+    ).all()
+    rules = db.session.scalars(
+        select(AvailabilityRule).where(
+            AvailabilityRule.doctor_id == doctor_id,
+            AvailabilityRule.start_date <= end.date(),
+            or_(
+                AvailabilityRule.end_date.is_(None),
+                AvailabilityRule.end_date >= start.date(),
+            ),
+        )
+    ).all()
+
+    slots = [
+        (f"availability-{row.id}@capstone", row.date_time, SLOT_MINUTES)
+        for row in stored
+    ]
+    seen = {row.date_time for row in stored}
+    for rule in rules:
+        for slot_start in rule_slot_starts(rule, start, end):
+            if slot_start not in seen:
+                seen.add(slot_start)
+                uid = f"rule-{rule.id}-{_stamp(slot_start)}@capstone"
+                slots.append((uid, slot_start, rule.slot_minutes))
+    slots.sort(key=lambda slot: slot[1])
+
+    length = timedelta(minutes=APPOINTMENT_MINUTES)
+    for uid, slot_start, minutes in slots:
+        i = bisect_right(booked, slot_start - length)
+        if i < len(booked) and booked[i] < slot_start + timedelta(minutes=minutes):
+            continue
+        yield uid, slot_start, minutes
+
+
+def generate_feed(user, start, end):
+    """Yield the iCalendar text of ``user``'s feed piece by piece: their
+    appointments in ``[start, end)`` and, for a doctor, the open slots,
+    stored or from recurring rules, that no booking overlaps. Appointments
+    are read from the cursor as they are written out. Events leave out the other participant's name, so renaming
+    a user never invalidates anybody else's feed."""
+    stamp = _stamp(datetime.utcnow())
+    refresh = current_app.config["CALENDAR_FEED_REFRESH_MINUTES"]
+    doctor = user.role == "doctor"
+    yield "".join(
+        [
+            "BEGIN:VCALENDAR\r\n",
+            "VERSION:2.0\r\n",
+            "PRODID:-//capstone//appointments//EN\r\n",
+            "CALSCALE:GREGORIAN\r\n",
+            "METHOD:PUBLISH\r\n",
+            "X-WR-CALNAME:Appointments\r\n",
+            f"REFRESH-INTERVAL;VALUE=DURATION:PT{refresh}M\r\n",
+            f"X-PUBLISHED-TTL:PT{refresh}M\r\n",
+        ]
+    )
+    # active bookings, in order, to hide the open slots they overlap (one
+    # starting before the window only touches a slot a month in the past)
+    booked = []
+    for row in _appointment_rows(user, start, end):
+        if row.status not in RELEASED_STATUSES:
+            booked.append(row.date_time)
+        yield _event(
+            f"appointment-{row.id}@capstone",
+            row.date_time,
+            APPOINTMENT_MINUTES,
+            "Patient appointment" if doctor else "Doctor appointment",
+            stamp,
+            status="CANCELLED" if row.status == "canceled" else "CONFIRMED",
+            description=row.client_requirements,
+        )
+    if doctor:
+        for uid, slot_start, minutes in _open_slots(user.id, start, end, booked):
+            yield _event(uid, slot_start, minutes, "Open slot", stamp)
+    yield "END:VCALENDAR\r\n"
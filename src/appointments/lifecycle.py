@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.app import db
+from src.appointments.models import APPOINTMENT_MINUTES, Appointment
+from src.helpers.pagination import after
+
+logger = logging.getLogger(__name__)
+
+# Rows per UPDATE. Each chunk is its own short transaction, so row locks are
+# held for one chunk at a time however far behind the job is.
+LIFECYCLE_CHUNK_SIZE = int(os.getenv("APPOINTMENT_LIFECYCLE_CHUNK_SIZE", 500))
+
+
+def _transition(old_status, new_status, window, chunk_size, pause):
+    """Move the ``old_status`` appointments matching ``window`` to
+    ``new_status``, ``chunk_size`` rows per transaction; returns the count.
+
+    Each chunk is found by walking the (status, date_time) index and updated
+    by primary key. The UPDATE re-checks the status, so a row changed in
+    between (e.g. canceled by the client) keeps the newer status.
+    """
+    order = (Appointment.date_time, Appointment.id)
+    moved, last = 0, None
+    while True:
+        statement = select(*order).where(Appointment.status == old_status, *window)
+        if last is not None:
+            statement = statement.where(after(order, last))
+        rows = db.session.execute(statement.order_by(*order).limit(chunk_size)).all()
+        if not rows:
+            return moved
+
+        result = db.session.execute(
+            update(Appointment)
+            .where(
+                Appointment.id.in_([row.id for row in rows]),
+                Appointment.status == old_status,
+            )
+            .values(status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        moved += result.rowcount
+        if len(rows) < chunk_size:
+            return moved
+        last = (rows[-1].date_time, rows[-1].id)
+        if pause:
+            # let the writers queued behind this chunk go first
+            time.sleep(pause)
+
+
+def advance_appointments(now=None, chunk_size=LIFECYCLE_CHUNK_SIZE, pause=0):
+    """Move appointments along up-coming -> on-going -> completed by the clock.
+
+    An appointment is on-going from its ``date_time`` for
+    ``APPOINTMENT_MINUTES`` and completed after that; ones the job missed
+    while they were running go straight to completed. Canceled appointments
+    are never touched. Returns how many rows reached each status.
+    """
+    now = now or datetime.utcnow()
+    ended = now - timedelta(minutes=APPOINTMENT_MINUTES)
+    completed = sum(
+        _transition(
+            old_status,
+            "completed",
+            [Appointment.date_time <= ended],
+            chunk_size,
+            pause,
+        )
+        for old_status in ("on-going", "up-coming")
+    )
+    started = _transition(
+        "up-coming",
+        "on-going",
+        [Appointment.date_time > ended, Appointment.date_time <= now],
+        chunk_size,
+        pause,
+    )
+    return {"on-going": started, "completed": completed}
+
+
+class LifecycleScheduler:
+    """Runs ``advance_appointments`` every ``interval`` seconds in a daemon
+    thread of the serving process."""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self.pid = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self.pid = os.getpid()
+        threading.Thread(
+            target=self._run, name="appointment-lifecycle", daemon=True
+        ).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    counts = advance_appointments()
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    logger.exception("appointment lifecycle run failed")
+                    continue
+                if any(counts.values()):
+                    logger.info("appointment lifecycle: %s", counts)
+
+
+def init_lifecycle(app):
+    """Start the in-process lifecycle scheduler when
+    ``APPOINTMENT_LIFECYCLE_INTERVAL`` is set (seconds; off by default)."""
+    app.config.setdefault(
+        "APPOINTMENT_LIFECYCLE_INTERVAL",
+        float(os.getenv("APPOINTMENT_LIFECYCLE_INTERVAL", 0)),
+    )
+    interval = app.config["APPOINTMENT_LIFECYCLE_INTERVAL"]
+    if not interval:
+        return
+    lock = threading.Lock()
+
+    # Started by the first request rather than here, so the thread belongs to
+    # the process that serves (gunicorn forks workers after loading the app)
+    # and CLI commands such as ``flask db upgrade`` never start it.
+    @app.before_request
+    def start_lifecycle_scheduler():
+        scheduler = app.extensions.get("lifecycle_scheduler")
+        if scheduler is not None and scheduler.pid == os.getpid():
+            return
+        with lock:
+            scheduler = app.extensions.get("lifecycle_scheduler")
+            if scheduler is None or scheduler.pid != os.getpid():
+                scheduler = LifecycleScheduler(app, interval)
+                scheduler.start()
+                app.extensions["lifecycle_scheduler"] = scheduler
@@ -1,14 +1,50 @@
+import os
 from datetime import datetime
 from typing import Literal, Optional
 
-from pydantic import BaseModel, Field
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, String
+from pydantic import BaseModel, Field, field_validator, model_validator
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.orm import joinedload, relationship, validates
 
 from src.app import db
+from src.helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.helpers.projection import Projection
+
+# How long an appointment occupies its doctor, from ``date_time`` on.
+APPOINTMENT_MINUTES = int(os.getenv("APPOINTMENT_MINUTES", 30))
+
+# Appointments in these states no longer hold their time.
+RELEASED_STATUSES = ("canceled",)
+
+# Appointments in these states are over; bulk actions leave them alone.
+FINAL_STATUSES = ("canceled", "completed")
 
 
 class Appointment(db.Model):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # One active booking per doctor and start time. Released appointments
+        # store NULL in holds_slot, and NULLs never collide in a unique index.
+        Index(
+            "uq_appointments_doctor_id_date_time_holds_slot",
+            "doctor_id",
+            "date_time",
+            "holds_slot",
+            unique=True,
+        ),
+        Index("ix_appointments_user_id_date_time", "user_id", "date_time"),
+        Index("ix_appointments_date_time", "date_time"),
+        Index("ix_appointments_status_date_time", "status", "date_time"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(
@@ -23,6 +59,10 @@ class Appointment(db.Model):
         default="up-coming",
     )
     client_requirements = Column(String(255))
+    holds_slot = Column(Boolean, default=True)
+
+    doctor = relationship("User", foreign_keys=[doctor_id], lazy="select")
+    client = relationship("User", foreign_keys=[user_id], lazy="select")
 
     def __init__(
         self, user_id, doctor_id, date_time, client_requirements, status="up-coming"
@@ -33,8 +73,19 @@ class Appointment(db.Model):
         self.status = status
         self.client_requirements = client_requirements
 
-    def to_dict(self):
-        return {
+    @validates("status")
+    def _release_slot(self, key, status):
+        self.holds_slot = None if status in RELEASED_STATUSES else True
+        return status
+
+    @staticmethod
+    def eager(expand):
+        """Loader options that fetch the ``expand``ed participants in the same
+        query (many-to-one, so the join never multiplies rows)."""
+        return [joinedload(getattr(Appointment, name)) for name in expand]
+
+    def to_dict(self, expand=()):
+        data = {
             "id": self.id,
             "user_id": self.user_id,
             "doctor_id": self.doctor_id,
@@ -42,6 +93,17 @@ class Appointment(db.Model):
             "status": self.status,
             "client_requirements": self.client_requirements,
         }
+        for name in expand:
+            participant = getattr(self, name)
+            data[name] = participant.to_summary() if participant else None
+        return data
+
+
+# ``Appointment.to_dict()`` without ``expand``, read straight from rows
+APPOINTMENT_PROJECTION = Projection(
+    Appointment,
+    ["id", "user_id", "doctor_id", "date_time", "status", "client_requirements"],
+)
 
 
 class AppointmentBase(BaseModel):
@@ -68,3 +130,66 @@ class AppointmentCreate(AppointmentBase):
 # ✅ Model for updating an appointment status
 class AppointmentUpdate(BaseModel):
     status: Optional[str] = Field(None, description="Update status of the appointment")
+
+
+# ✅ ``?expand=doctor,client`` on the appointment read endpoints
+class AppointmentExpand(BaseModel):
+    expand: list[Literal["doctor", "client"]] = Field(
+        [], description="Participants to embed in each appointment"
+    )
+
+    @field_validator("expand", mode="before")
+    @classmethod
+    def split_expand(cls, value):
+        if isinstance(value, str):
+            # keep the order stable and drop repeats
+            return list(dict.fromkeys(v.strip() for v in value.split(",") if v.strip()))
+        return value
+
+
+# ✅ Query parameters for listing appointments
+class AppointmentQuery(AppointmentExpand):
+    from_: Optional[datetime] = Field(
+        None, alias="from", description="Only appointments at or after this time"
+    )
+    to: Optional[datetime] = Field(
+        None, description="Only appointments before this time"
+    )
+    status: Optional[
+        Literal[
+            "pending", "confirmed", "on-going", "completed", "canceled", "up-coming"
+        ]
+    ] = Field(None, description="Only appointments with this status")
+    doctor_id: Optional[int] = Field(None, gt=0, description="Only this doctor's")
+    cursor: Optional[str] = Field(None, description="Cursor returned by the last page")
+    limit: int = Field(
+        DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE, description="Page size"
+    )
+
+
+# ✅ What to do with the future appointments of blocked doctors
+class DoctorAppointmentsAction(BaseModel):
+    action: Literal["cancel", "reassign"] = Field(
+        ..., description="Cancel them or move them to another doctor"
+    )
+    reassign_to: Optional[int] = Field(
+        None, gt=0, description="Doctor taking over (required to reassign)"
+    )
+    on_conflict: Literal["abort", "cancel"] = Field(
+        "abort",
+        description="When the new doctor is busy: change nothing, or cancel those",
+    )
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.action == "reassign") != (self.reassign_to is not None):
+            raise ValueError("'reassign_to' is required to reassign, and only then")
+        return self
+
+
+# ✅ Bulk action on the future appointments of blocked doctors (admin only)
+class DoctorAppointmentsBulk(DoctorAppointmentsAction):
+    doctor_ids: list[int] = Field(
+        ..., min_length=1, max_length=10000, description="Blocked doctors"
+    )
+    dry_run: bool = Field(False, description="Report the counts, change nothing")
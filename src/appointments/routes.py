@@ -1,79 +1,216 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from datetime import timedelta
+from functools import partial
+
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+    url_for,
+)
+from flask_jwt_extended import current_user, get_jwt, jwt_required
 from pydantic import ValidationError
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from werkzeug.http import is_resource_modified
 
+from src.admin.analytics import record_daily_stats
 from src.app import db
-from src.appointments.models import Appointment, AppointmentCreate, AppointmentUpdate
+from src.appointments.calendar import (
+    bump_calendars,
+    feed_etag,
+    feed_token,
+    feed_window,
+    generate_feed,
+    load_feed_token,
+)
+from src.appointments.models import (
+    APPOINTMENT_MINUTES,
+    APPOINTMENT_PROJECTION,
+    Appointment,
+    AppointmentCreate,
+    AppointmentExpand,
+    AppointmentQuery,
+    AppointmentUpdate,
+)
+from src.helpers.cache import get_cache
+from src.helpers.pagination import (
+    InvalidCursor,
+    after,
+    decode_cursor,
+    encode_cursor,
+    keyset_bound,
+    keyset_paginate,
+)
+from src.helpers.profiler import query_budget
+from src.helpers.streaming import stream_query, wants_stream
 from src.users.models import User
 from src.utils import role_required
 
 appointments = Blueprint("appointments", __name__)
 
 
-# ✅ Get all appointments for any user (admin, doctor, client)
+def _filtered_appointments(user, params, query=None):
+    """Narrow ``query`` (``Appointment.query`` by default, or a ``select()``)
+    to the appointments visible to ``user`` with ``params`` applied."""
+    if query is None:
+        query = Appointment.query
+    if user.role == "doctor":
+        # doctor's view: only appointments assigned to them
+        query = query.filter(Appointment.doctor_id == user.id)
+    elif user.role == "client":
+        # client's view: only their own appointments
+        query = query.filter(Appointment.user_id == user.id)
+
+    if params.doctor_id is not None:
+        query = query.filter(Appointment.doctor_id == params.doctor_id)
+    if params.status is not None:
+        query = query.filter(Appointment.status == params.status)
+    if params.from_ is not None:
+        query = query.filter(Appointment.date_time >= params.from_)
+    if params.to is not None:
+        query = query.filter(Appointment.date_time < params.to)
+    return query
+
+
+# ✅ Get appointments for any user (admin, doctor, client), one page at a time
 @appointments.get("/")
+@query_budget(2)
 @jwt_required()
 @role_required(["admin", "doctor", "client"])
 def get_all_appointments():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"message": "user not found"}), 404
+    order = (Appointment.date_time, Appointment.id)
+    try:
+        params = AppointmentQuery(**request.args.to_dict())
+        if params.expand:
+            # embedded participants need the ORM objects and their joins
+            query = _filtered_appointments(current_user, params).options(
+                *Appointment.eager(params.expand)
+            )
+            serialize = partial(Appointment.to_dict, expand=params.expand)
+        else:
+            query = _filtered_appointments(
+                current_user, params, APPOINTMENT_PROJECTION.query()
+            )
+            serialize = APPOINTMENT_PROJECTION.to_dict
+        if wants_stream():
+            # everything from the cursor on, or one page when limit is given
+            if params.cursor:
+                query = query.filter(after(order, decode_cursor(params.cursor, order)))
+            next_cursor = None
+            if "limit" in request.args:
+                bound = keyset_bound(query, order, params.limit)
+                if bound is not None:
+                    # up to the bound rather than LIMIT, so rows booked
+                    # meanwhile cannot push a row past the next cursor
+                    query = query.filter(~after(order, bound))
+                    next_cursor = encode_cursor(bound)
+            response = stream_query(
+                query.order_by(*order),
+                serialize,
+                key="appointments",
+                extra={"next_cursor": next_cursor},
+            )
+            if next_cursor:
+                # NDJSON bodies carry rows only
+                response.headers["Next-Cursor"] = next_cursor
+            return response
+        appointments_list, next_cursor = keyset_paginate(
+            query, order, cursor=params.cursor, limit=params.limit
+        )
+    except (ValidationError, InvalidCursor) as e:
+        return jsonify({"error": str(e)}), 400
 
-    if user.role == "doctor":
-        # doctor's view: Get all appointments assigned to them
-        appointments_list = Appointment.query.filter_by(doctor_id=user_id).all()
-    elif user.role == "client":
-        # client's view: Get all their appointments
-        appointments_list = Appointment.query.filter_by(user_id=user_id).all()
-    else:
-        # admin's view: Get all appointments
-        appointments_list = Appointment.query.all()
+    return jsonify(
+        {
+            "appointments": [serialize(row) for row in appointments_list],
+            "next_cursor": next_cursor,
+        }
+    )
 
-    return jsonify([appointment.to_dict() for appointment in appointments_list])
+
+@appointments.get("/count")
+@query_budget(2)
+@jwt_required()
+@role_required(["admin", "doctor", "client"])
+def count_appointments():
+    try:
+        params = AppointmentQuery(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = _filtered_appointments(current_user, params).with_entities(
+        func.count(Appointment.id)
+    )
+    return jsonify({"count": query.scalar()})
 
 
 @appointments.get("/<int:appointment_id>")
+@query_budget(2)
 @jwt_required()
 @role_required(["admin", "doctor", "client"])
 def get_appointment(appointment_id):
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"message": "user not found"}), 404
+    user = current_user
+    try:
+        params = AppointmentExpand(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
 
-    appointment = Appointment.query.get(appointment_id)
+    appointment = db.session.get(
+        Appointment, appointment_id, options=Appointment.eager(params.expand)
+    )
 
     if not appointment:
         return jsonify({"error": "Appointment not found"}), 404
 
     # Authorization: doctor can only view their own appointments
-    if user.role == "doctor" and appointment.doctor_id != user_id:
+    if user.role == "doctor" and appointment.doctor_id != user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
     # client can only view their own appointments
-    if user.role == "client" and appointment.user_id != user_id:
+    if user.role == "client" and appointment.user_id != user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
-    return jsonify({"appointment": appointment.to_dict()})
+    return jsonify({"appointment": appointment.to_dict(params.expand)})
 
 
 @appointments.post("/")
+@query_budget(6)
 @jwt_required()
 @role_required(["client"])
 def create_appointment():
     try:
-        current_user = get_jwt_identity()
         data = request.get_json()
         appointment_data = AppointmentCreate(**data)
-        user = User.query.get(appointment_data.user_id)
-        doctor = User.query.get(appointment_data.doctor_id)
+        if appointment_data.user_id != current_user.id:
+            return jsonify({"message": "Not Allowed"}), 403
 
-        if not user or not doctor or user.role != "client" or doctor.role != "doctor":
+        # Locking the doctor's row serializes their bookings on MySQL and
+        # PostgreSQL. The overlap check is a locking read too: under MySQL's
+        # REPEATABLE READ a plain read may answer from a snapshot taken by an
+        # earlier read of this transaction and miss a booking committed while
+        # we waited for the lock. SQLite ignores FOR UPDATE, so there only the
+        # unique index below, which catches identical start times, applies.
+        doctor = db.session.get(User, appointment_data.doctor_id, with_for_update=True)
+        if not doctor or doctor.role != "doctor":
             return jsonify({"message": "One id must be a doctor"}), 400
-        if str(user.id) != current_user:
-            return jsonify({"message": "Not Allowed"}), 403
+
+        length = timedelta(minutes=APPOINTMENT_MINUTES)
+        overlapping = db.session.execute(
+            select(Appointment.id)
+            .where(
+                Appointment.doctor_id == appointment_data.doctor_id,
+                Appointment.date_time > appointment_data.date_time - length,
+                Appointment.date_time < appointment_data.date_time + length,
+                Appointment.holds_slot.is_not(None),
+            )
+            .limit(1)
+            .with_for_update()
+        ).first()
+        if overlapping:
+            return jsonify({"error": "Doctor is already booked at this time"}), 409
+
         new_appointment = Appointment(
             user_id=appointment_data.user_id,
             doctor_id=appointment_data.doctor_id,
@@ -82,31 +219,38 @@ def create_appointment():
         )
 
         db.session.add(new_appointment)
+        bump_calendars([appointment_data.user_id, appointment_data.doctor_id])
+        record_daily_stats(
+            "appointments",
+            added=[(appointment_data.doctor_id, appointment_data.date_time)],
+        )
         db.session.commit()
         return jsonify({"msg": "Appointment created successfully"}), 201
     except ValidationError as e:
         return jsonify({"error": str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Doctor is already booked at this time"}), 409
     except SQLAlchemyError:
+        db.session.rollback()
         return jsonify({"error": "Failed to create appointment"}), 500
 
 
 @appointments.put("/status/<int:appointment_id>")
+@query_budget(5)
 @jwt_required()
 @role_required(["doctor", "client"])
 def update_appointment_status(appointment_id):
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
+    user_id = current_user.id
     data = request.get_json()
     try:
         updated_appointment = AppointmentUpdate(**data)
     except Exception as e:
         return jsonify({"error": f"Invalid data: {str(e)}"}), 400
 
-    appointment = Appointment.query.get(appointment_id)
+    # locked, so two concurrent cancels cannot both pass the check below and
+    # both count in the daily stats
+    appointment = db.session.get(Appointment, appointment_id, with_for_update=True)
 
     if not appointment:
         return jsonify({"error": "Appointment not found"}), 404
@@ -121,6 +265,11 @@ def update_appointment_status(appointment_id):
         )
 
     appointment.status = updated_appointment.status
+    bump_calendars([appointment.user_id, appointment.doctor_id])
+    if appointment.status == "canceled":
+        record_daily_stats(
+            "canceled", added=[(appointment.doctor_id, appointment.date_time)]
+        )
 
     db.session.commit()
 
@@ -128,3 +277,70 @@ def update_appointment_status(appointment_id):
         jsonify({"msg": f"Appointment {updated_appointment.status} successfully"}),
         200,
     )
+
+
+# ✅ Subscribable iCalendar feed of the caller's appointments
+@appointments.get("/calendar")
+@query_budget(1)
+@jwt_required()
+@role_required(["doctor", "client"])
+def get_calendar_feed_url():
+    token = feed_token(current_user.id, get_jwt().get("sv", 0))
+    return jsonify(
+        {
+            "feed_url": url_for(
+                "appointments.get_calendar_feed", token=token, _external=True
+            )
+        }
+    )
+
+
+@appointments.get("/calendar/<token>.ics")
+@query_budget(4)
+def get_calendar_feed(token):
+    """Serve a feed to calendar apps, which cannot refresh JWTs: the signed
+    token in the URL is the credential. An unchanged feed costs one
+    primary-key read, answered with a 304 or from the cache."""
+    claims = load_feed_token(token)
+    user = db.session.get(User, claims[0]) if claims else None
+    if (
+        user is None
+        or user.blocked
+        or user.role not in ("doctor", "client")
+        or (user.security_version or 0) != claims[1]
+    ):
+        return jsonify({"error": "Calendar feed not found"}), 404
+
+    start, end = feed_window()
+    etag = feed_etag(user, start)
+    if not is_resource_modified(request.environ, etag=etag):
+        response = current_app.response_class(status=304)
+    else:
+        cache = get_cache()
+        key = f"calendar:{etag}"
+        body = cache.get(key) if cache is not None else None
+        if body is not None:
+            response = current_app.response_class(body, mimetype="text/calendar")
+        else:
+            response = current_app.response_class(
+                stream_with_context(_feed_body(user, start, end, cache, key)),
+                mimetype="text/calendar",
+            )
+
+    # the feed embeds a generation timestamp, so the tag is weak
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _feed_body(user, start, end, cache, key):
+    """Stream the feed and, once it is complete, keep it in the cache for
+    the workers that get the next poll."""
+    chunks = []
+    for chunk in generate_feed(user, start, end):
+        if cache is not None:
+            chunks.append(chunk)
+        yield chunk
+    if cache is not None:
+        cache.set(key, "".join(chunks).encode())
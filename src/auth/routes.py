@@ -2,17 +2,38 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
-    get_jwt_identity,
+    current_user,
+    get_jwt,
     jwt_required,
 )
 from pydantic import ValidationError
 
 from src.app import db
+from src.helpers.conditional import DOCTORS, USERS, bump_version
+from src.helpers.db import reads_primary
+from src.helpers.jwt_config import token_claims
+from src.helpers.passwords import PasswordHashingBusy
+from src.helpers.profiler import query_budget
+from src.helpers.revocation import (
+    RevocationStoreUnavailable,
+    get_revocation_store,
+    refresh_token_revoked,
+    revoke_refresh_token,
+    revoked_by_user,
+)
 from src.users.models import User, UserCreate, UserLogin
+from src.users.search import get_search_index
 
 auth = Blueprint("auth", __name__)
 
 
+@auth.errorhandler(PasswordHashingBusy)
+def handle_password_hashing_busy(e):
+    response = jsonify({"error": "Too many sign-ins right now, try again shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
 @auth.post("/signup")
 def signup():
     try:
@@ -36,10 +57,21 @@ def signup():
     )
 
     db.session.add(new_user)
+    bump_version(USERS)
+    if new_user.role == "doctor":
+        bump_version(DOCTORS)
     db.session.commit()
+    index = get_search_index()
+    if index is not None:
+        index.update(new_user)
 
-    access_token = create_access_token(identity=str(new_user.id))
-    refresh_token = create_refresh_token(identity=str(new_user.id))
+    claims = token_claims(new_user)
+    access_token = create_access_token(
+        identity=str(new_user.id), additional_claims=claims
+    )
+    refresh_token = create_refresh_token(
+        identity=str(new_user.id), additional_claims=claims
+    )
 
     return jsonify(
         {
@@ -67,10 +99,15 @@ def login():
 
     if not user or not user.check_password(password):
         return jsonify({"error": "Invalid email or password"}), 401
-    access_token = create_access_token(identity=str(user.id))
-    refresh_token = create_refresh_token(identity=str(user.id))
+    if user.rehash_password_if_needed(password):
+        db.session.commit()
     if user.blocked:
         return jsonify({"message": "You are blocked"}), 403
+    claims = token_claims(user)
+    access_token = create_access_token(identity=str(user.id), additional_claims=claims)
+    refresh_token = create_refresh_token(
+        identity=str(user.id), additional_claims=claims
+    )
     return jsonify(
         {
             "access_token": access_token,
@@ -81,27 +118,43 @@ def login():
 
 
 @auth.get("/user/me")
+@query_budget(1)
 @jwt_required()
 def get_current_user():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
     # Return user data as a dictionary
-    return jsonify({"user": user.to_dict()})
+    return jsonify({"user": current_user.to_dict()})
 
 
 @auth.get("/refresh")
+@reads_primary
+@query_budget(2)
 @jwt_required(refresh=True)
 def refresh_token():
-    user_id = get_jwt_identity()
-    new_access_token = create_access_token(identity=str(user_id))
+    # Access tokens are trusted without a query until they expire; refreshing
+    # re-reads the row and the logged-out tokens, so other workers' missed
+    # revocations end here.
+    claims = get_jwt()
+    user = db.session.get(User, current_user.id)
+    if revoked_by_user(claims, user) or refresh_token_revoked(claims):
+        return jsonify({"msg": "Token has been revoked"}), 401
+    new_access_token = create_access_token(
+        identity=str(user.id), additional_claims=token_claims(user)
+    )
     return jsonify({"access_token": new_access_token})
 
 
+# ✅ Revoke the presented token; send the refresh token too to end the session
 @auth.post("/logout")
-@jwt_required()
+@jwt_required(verify_type=False)
 def logout():
+    claims = get_jwt()
+    if claims["type"] == "refresh":
+        # the store may be this worker's alone; every worker's refresh reads this
+        revoke_refresh_token(claims)
+        db.session.commit()
+    try:
+        get_revocation_store().revoke_token(claims["jti"], claims["exp"])
+    except RevocationStoreUnavailable:
+        if claims["type"] != "refresh":
+            return jsonify({"error": "Could not log out, try again shortly"}), 503
     return jsonify({"msg": "Successfully logged out"})
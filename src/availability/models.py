@@ -1,15 +1,33 @@
-from datetime import datetime
+import os
+from datetime import date, datetime, time, timedelta
 from typing import Optional
 
-from pydantic import BaseModel, Field
-from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from pydantic import BaseModel, Field, field_validator, model_validator
+from sqlalchemy import JSON, Column, Date, DateTime, ForeignKey, Index, Integer, Time
 from sqlalchemy.orm import relationship
 
 from src.app import db
+from src.helpers.projection import Projection
+
+# Each availability row opens the block [date_time, date_time + SLOT_MINUTES).
+SLOT_MINUTES = int(os.getenv("AVAILABILITY_SLOT_MINUTES", 30))
+
+# Upper bound on the slots a single bulk request may insert.
+MAX_BULK_SLOTS = 5000
 
 
 class Availability(db.Model):
     __tablename__ = "availability"
+    __table_args__ = (
+        # a doctor publishes each start time once, however the writes race
+        Index(
+            "uq_availability_doctor_id_date_time",
+            "doctor_id",
+            "date_time",
+            unique=True,
+        ),
+        Index("ix_availability_date_time", "date_time"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     doctor_id = Column(
@@ -32,6 +50,66 @@ class Availability(db.Model):
         return data
 
 
+# ``Availability.to_dict`` read straight from rows, for list endpoints
+AVAILABILITY_PROJECTION = Projection(Availability, ["id", "doctor_id", "date_time"])
+
+
+class AvailabilityRule(db.Model):
+    """Weekly availability pattern, expanded into slots on demand."""
+
+    __tablename__ = "availability_rules"
+    __table_args__ = (
+        Index("ix_availability_rules_doctor_id_start_date", "doctor_id", "start_date"),
+        # rules of all doctors in a date range (utilization analytics)
+        Index("ix_availability_rules_start_date", "start_date"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doctor_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    weekdays = Column(JSON, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    slot_minutes = Column(Integer, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date)  # open-ended when NULL
+    exceptions = Column(JSON, nullable=False, default=list)  # ISO dates to skip
+
+    def __init__(
+        self,
+        doctor_id,
+        weekdays,
+        start_time,
+        end_time,
+        slot_minutes,
+        start_date,
+        end_date=None,
+        exceptions=None,
+    ):
+        self.doctor_id = doctor_id
+        self.weekdays = sorted(set(weekdays))
+        self.start_time = start_time
+        self.end_time = end_time
+        self.slot_minutes = slot_minutes
+        self.start_date = start_date
+        self.end_date = end_date
+        self.exceptions = sorted({day.isoformat() for day in exceptions or []})
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "doctor_id": self.doctor_id,
+            "weekdays": self.weekdays,
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "slot_minutes": self.slot_minutes,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat() if self.end_date else None,
+            "exceptions": self.exceptions,
+        }
+
+
 class AvailabilityBase(BaseModel):
     doctor_id: int = Field(..., description="ID of the doctor")
     date_time: datetime = Field(
@@ -45,3 +123,89 @@ class AvailabilityCreate(AvailabilityBase):
 
 class AvailabilityUpdate(BaseModel):
     date_time: Optional[datetime] = Field(None, description="Updated date and time")
+
+
+class SlotQuery(BaseModel):
+    from_: datetime = Field(..., alias="from", description="Start of the window")
+    to: datetime = Field(..., description="End of the window")
+    duration: Optional[int] = Field(
+        None, gt=0, le=480, description="Slot length in minutes"
+    )
+    doctor_ids: Optional[list[int]] = Field(
+        None, max_length=100, description="Doctors to compute slots for"
+    )
+
+    @field_validator("doctor_ids", mode="before")
+    @classmethod
+    def split_ids(cls, value):
+        if isinstance(value, str):
+            return [part for part in value.split(",") if part.strip()]
+        return value
+
+    @model_validator(mode="after")
+    def check_window(self):
+        if self.to <= self.from_:
+            raise ValueError("'to' must be after 'from'")
+        if self.to - self.from_ > timedelta(days=31):
+            raise ValueError("window must not exceed 31 days")
+        return self
+
+
+class AvailabilityRuleBase(BaseModel):
+    weekdays: list[int] = Field(
+        ..., min_length=1, max_length=7, description="0 = Monday ... 6 = Sunday"
+    )
+    start_time: time = Field(..., description="Daily start time")
+    end_time: time = Field(..., description="Daily end time")
+    slot_minutes: int = Field(
+        SLOT_MINUTES, gt=0, le=480, description="Slot length in minutes"
+    )
+    start_date: date = Field(..., description="First day the rule applies")
+    end_date: Optional[date] = Field(None, description="Last day the rule applies")
+    exceptions: list[date] = Field(
+        default_factory=list, max_length=366, description="Days to skip"
+    )
+
+    @field_validator("weekdays")
+    @classmethod
+    def check_weekdays(cls, value):
+        if any(day < 0 or day > 6 for day in value):
+            raise ValueError("weekdays must be between 0 (Monday) and 6 (Sunday)")
+        return value
+
+    @model_validator(mode="after")
+    def check_ranges(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("'end_time' must be after 'start_time'")
+        if self.end_date is not None and self.end_date < self.start_date:
+            raise ValueError("'end_date' must not be before 'start_date'")
+        return self
+
+
+class AvailabilityRuleCreate(AvailabilityRuleBase):
+    doctor_id: int = Field(..., description="ID of the doctor")
+
+
+class AvailabilityBulkCreate(BaseModel):
+    doctor_id: int = Field(..., description="ID of the doctor")
+    date_times: Optional[list[datetime]] = Field(
+        None, max_length=MAX_BULK_SLOTS, description="Explicit slot start times"
+    )
+    rule: Optional[AvailabilityRuleBase] = Field(
+        None,
+        description="Pattern to expand into slots (needs an end_date and the "
+        "default slot_minutes)",
+    )
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.date_times is None) == (self.rule is None):
+            raise ValueError("provide exactly one of 'date_times' or 'rule'")
+        if self.rule is not None and self.rule.end_date is None:
+            raise ValueError("'rule.end_date' is required for bulk creation")
+        # each created row opens SLOT_MINUTES; longer slots would not survive
+        if self.rule is not None and self.rule.slot_minutes != SLOT_MINUTES:
+            raise ValueError(
+                f"'rule.slot_minutes' must be {SLOT_MINUTES} for bulk creation"
+            )
+        return self
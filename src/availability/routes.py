@@ -1,36 +1,67 @@
+from datetime import datetime, time, timedelta
+
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import current_user, jwt_required
 from pydantic import ValidationError
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+from src.admin.analytics import record_daily_stats
 from src.app import db
-from src.availability.models import Availability, AvailabilityCreate, AvailabilityUpdate
-from src.users.models import User
+from src.appointments.calendar import bump_calendars
+from src.availability.models import (
+    AVAILABILITY_PROJECTION,
+    MAX_BULK_SLOTS,
+    SLOT_MINUTES,
+    Availability,
+    AvailabilityBulkCreate,
+    AvailabilityCreate,
+    AvailabilityRule,
+    AvailabilityRuleCreate,
+    AvailabilityUpdate,
+    SlotQuery,
+)
+from src.availability.slots import compute_free_slots, rule_slot_starts
+from src.helpers.cache import cached
+from src.helpers.conditional import AVAILABILITY, bump_version, conditional
+from src.helpers.profiler import query_budget
+from src.helpers.streaming import stream_query, wants_stream
 from src.utils import role_required
 
 availability = Blueprint("availability", __name__)
 
 
+def _visible_to():
+    # doctors only see their own rows; admins and clients share one view
+    return current_user.id if current_user.role == "doctor" else "all"
+
+
 @availability.get("/")
+@query_budget(3)
+@jwt_required()
 @role_required(["admin", "doctor", "client"])
+@conditional(AVAILABILITY)
+@cached(AVAILABILITY, scope=_visible_to)
 def get_all_availabilities():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"message": " User not found"}), 404
-    if user.role == "doctor":
+    query = AVAILABILITY_PROJECTION.query()
+    if current_user.role == "doctor":
         # doctor sees only their availability
-        availabilities_list = Availability.query.filter_by(doctor_id=user_id).all()
-    else:
-        # admin and user sees all availabilities
-        availabilities_list = Availability.query.all()
+        query = query.filter(Availability.doctor_id == current_user.id)
+    # admin and user sees all availabilities
+    query = query.order_by(Availability.id)
+
+    if wants_stream():
+        return stream_query(query, AVAILABILITY_PROJECTION.to_dict)
 
-    return jsonify([availability.to_dict() for availability in availabilities_list])
+    return jsonify([AVAILABILITY_PROJECTION.to_dict(row) for row in query])
 
 
 # ✅ Get availability by ID
 @availability.get("/<int:availability_id>")
+@query_budget(3)
+@jwt_required()
 @role_required(["admin", "doctor", "client"])
+@cached(AVAILABILITY, scope=_visible_to)
 def get_availability(availability_id):
     availability = Availability.query.get(availability_id)
 
@@ -38,19 +69,62 @@ def get_availability(availability_id):
         return jsonify({"error": "Availability not found"}), 404
 
     # doctor can only access their own availability
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    if user.role == "doctor" and availability.doctor_id != user_id:
+    if current_user.role == "doctor" and availability.doctor_id != current_user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
     return jsonify({"availability": availability.to_dict()})
 
 
+def _slots_to_dict(slots):
+    return [
+        {"start": start.isoformat(), "end": end.isoformat()} for start, end in slots
+    ]
+
+
+# ✅ Free slots of one doctor in a time window
+@availability.get("/doctors/<int:doctor_id>/slots")
+@query_budget(4)
+@jwt_required()
+@role_required(["admin", "doctor", "client"])
+def get_doctor_slots(doctor_id):
+    try:
+        params = SlotQuery(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    duration = timedelta(minutes=params.duration or SLOT_MINUTES)
+    slots = compute_free_slots([doctor_id], params.from_, params.to, duration)
+    return jsonify({"doctor_id": doctor_id, "slots": _slots_to_dict(slots[doctor_id])})
+
+
+# ✅ Free slots of many doctors in one pass
+@availability.get("/slots")
+@query_budget(4)
+@jwt_required()
+@role_required(["admin", "doctor", "client"])
+def get_slots():
+    try:
+        params = SlotQuery(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    if not params.doctor_ids:
+        return jsonify({"error": "doctor_ids is required"}), 400
+
+    duration = timedelta(minutes=params.duration or SLOT_MINUTES)
+    slots = compute_free_slots(params.doctor_ids, params.from_, params.to, duration)
+    return jsonify(
+        {
+            "slots": {
+                str(doctor_id): _slots_to_dict(doctor_slots)
+                for doctor_id, doctor_slots in slots.items()
+            }
+        }
+    )
+
+
 # ✅ Create availability (doctor only)
 @availability.post("/")
+@jwt_required()
 @role_required(["doctor"])
 def create_availability():
     try:
@@ -58,8 +132,7 @@ def create_availability():
         availability_data = AvailabilityCreate(**data)
 
         # Check if the logged-in doctor is adding their own availability
-        user_id = get_jwt_identity()
-        if availability_data.doctor_id != user_id:
+        if availability_data.doctor_id != current_user.id:
             return (
                 jsonify({"error": "doctors can only set their own availability"}),
                 403,
@@ -71,13 +144,166 @@ def create_availability():
         )
 
         db.session.add(new_availability)
+        bump_version(AVAILABILITY)
+        bump_calendars([availability_data.doctor_id])
+        record_daily_stats(
+            "slots",
+            added=[(availability_data.doctor_id, availability_data.date_time)],
+        )
         db.session.commit()
         return jsonify({"msg": "Availability created successfully"}), 201
     except ValidationError as e:
         return jsonify({"error": str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "This slot is already published"}), 409
+    except SQLAlchemyError:
+        return jsonify({"error": "Failed to create availability"}), 500
+
+
+# ✅ Create many availability slots in one transaction (doctor only)
+@availability.post("/bulk")
+@query_budget(6)
+@jwt_required()
+@role_required(["doctor"])
+def create_availability_bulk():
+    try:
+        bulk_data = AvailabilityBulkCreate(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if bulk_data.doctor_id != current_user.id:
+        return jsonify({"error": "doctors can only set their own availability"}), 403
+
+    if bulk_data.rule is not None:
+        rule = bulk_data.rule
+        date_times = rule_slot_starts(
+            rule,
+            datetime.combine(rule.start_date, time.min),
+            datetime.combine(rule.end_date + timedelta(days=1), time.min),
+            # one past the cap is enough to turn the request down
+            limit=MAX_BULK_SLOTS + 1,
+        )
+    else:
+        date_times = bulk_data.date_times
+
+    date_times = sorted(set(date_times))
+    if len(date_times) > MAX_BULK_SLOTS:
+        return (
+            jsonify({"error": f"At most {MAX_BULK_SLOTS} slots per request"}),
+            400,
+        )
+
+    new_date_times = []
+    if date_times:
+        # one range query finds every slot the doctor already published
+        existing = set(
+            db.session.scalars(
+                db.select(Availability.date_time).where(
+                    Availability.doctor_id == bulk_data.doctor_id,
+                    Availability.date_time >= date_times[0],
+                    Availability.date_time <= date_times[-1],
+                )
+            )
+        )
+        new_date_times = [dt for dt in date_times if dt not in existing]
+
+    try:
+        if new_date_times:
+            db.session.execute(
+                insert(Availability),
+                [
+                    {"doctor_id": bulk_data.doctor_id, "date_time": dt}
+                    for dt in new_date_times
+                ],
+            )
+            bump_version(AVAILABILITY)
+            bump_calendars([bulk_data.doctor_id])
+            record_daily_stats(
+                "slots", added=[(bulk_data.doctor_id, dt) for dt in new_date_times]
+            )
+        db.session.commit()
+    except IntegrityError:
+        # published by a concurrent request after the check above
+        db.session.rollback()
+        return (
+            jsonify({"error": "Some of these slots were just published, try again"}),
+            409,
+        )
     except SQLAlchemyError:
+        db.session.rollback()
         return jsonify({"error": "Failed to create availability"}), 500
 
+    return (
+        jsonify(
+            {
+                "msg": "Availability created successfully",
+                "created": len(new_date_times),
+                "skipped": len(date_times) - len(new_date_times),
+            }
+        ),
+        201,
+    )
+
+
+# ✅ Recurring availability rules, expanded when slots are queried
+@availability.get("/rules")
+@query_budget(2)
+@jwt_required()
+@role_required(["admin", "doctor", "client"])
+def get_availability_rules():
+    query = AvailabilityRule.query
+    if current_user.role == "doctor":
+        query = query.filter_by(doctor_id=current_user.id)
+    elif request.args.get("doctor_id", type=int):
+        query = query.filter_by(doctor_id=request.args.get("doctor_id", type=int))
+
+    return jsonify({"rules": [rule.to_dict() for rule in query.all()]})
+
+
+@availability.post("/rules")
+@jwt_required()
+@role_required(["doctor"])
+def create_availability_rule():
+    try:
+        rule_data = AvailabilityRuleCreate(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if rule_data.doctor_id != current_user.id:
+        return jsonify({"error": "doctors can only set their own availability"}), 403
+
+    rule = AvailabilityRule(**rule_data.model_dump())
+    try:
+        db.session.add(rule)
+        # its slots show in the doctor's calendar feed
+        bump_calendars([rule.doctor_id])
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"error": "Failed to create availability rule"}), 500
+
+    return jsonify({"msg": "Availability rule created", "rule": rule.to_dict()}), 201
+
+
+@availability.delete("/rules/<int:rule_id>")
+@jwt_required()
+@role_required(["admin", "doctor"])
+def delete_availability_rule(rule_id):
+    rule = db.session.get(AvailabilityRule, rule_id)
+
+    if not rule:
+        return jsonify({"error": "Availability rule not found"}), 404
+
+    if current_user.role == "doctor" and rule.doctor_id != current_user.id:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    db.session.delete(rule)
+    bump_calendars([rule.doctor_id])
+    db.session.commit()
+
+    return jsonify({"msg": "Availability rule deleted successfully"}), 200
+
 
 @availability.put("/<int:availability_id>")
 @jwt_required()
@@ -89,8 +315,7 @@ def update_availability(availability_id):
         return jsonify({"error": "Availability not found"}), 404
 
     # Only the doctor who created the availability can modify it
-    user_id = get_jwt_identity()
-    if availability.doctor_id != user_id:
+    if availability.doctor_id != current_user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
     try:
@@ -98,12 +323,22 @@ def update_availability(availability_id):
         update_data = AvailabilityUpdate(**data)
 
         if update_data.date_time:
+            record_daily_stats(
+                "slots",
+                added=[(availability.doctor_id, update_data.date_time)],
+                removed=[(availability.doctor_id, availability.date_time)],
+            )
             availability.date_time = update_data.date_time
+            bump_version(AVAILABILITY)
+            bump_calendars([availability.doctor_id])
 
         db.session.commit()
         return jsonify({"msg": "Availability updated successfully"}), 200
     except ValidationError as e:
         return jsonify({"error": str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "This slot is already published"}), 409
     except SQLAlchemyError:
         return jsonify({"error": "Failed to update availability"}), 500
 
@@ -118,14 +353,15 @@ def delete_availability(availability_id):
         return jsonify({"error": "Availability not found"}), 404
 
     # doctor can only delete their own availability
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"message": "User not found"}), 404
-    if user.role == "doctor" and availability.doctor_id != user_id:
+    if current_user.role == "doctor" and availability.doctor_id != current_user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
     db.session.delete(availability)
+    bump_version(AVAILABILITY)
+    bump_calendars([availability.doctor_id])
+    record_daily_stats(
+        "slots", removed=[(availability.doctor_id, availability.date_time)]
+    )
     db.session.commit()
 
     return jsonify({"msg": "Availability deleted successfully"}), 200
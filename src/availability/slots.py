@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import or_
+
+from src.app import db
+from src.appointments.models import APPOINTMENT_MINUTES, Appointment
+from src.availability.models import SLOT_MINUTES, Availability, AvailabilityRule
+
+
+def merge_intervals(intervals):
+    """Merge [start, end) intervals sorted by start into disjoint intervals."""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def rule_intervals(rule, window_start, window_end):
+    """Working hours [start, end) that ``rule`` opens inside the window."""
+    first = max(rule.start_date, window_start.date())
+    last = window_end.date()
+    if rule.end_date is not None:
+        last = min(last, rule.end_date)
+    skip = {str(day) for day in rule.exceptions}
+
+    intervals = []
+    day = first
+    while day <= last:
+        if day.weekday() in rule.weekdays and day.isoformat() not in skip:
+            start = datetime.combine(day, rule.start_time)
+            end = datetime.combine(day, rule.end_time)
+            if start < window_end and end > window_start:
+                intervals.append([start, end])
+        day += timedelta(days=1)
+    return intervals
+
+
+def rule_slot_starts(rule, window_start, window_end, limit=None):
+    """Slot start times ``rule`` produces inside the window; stops after
+    ``limit`` of them."""
+    length = timedelta(minutes=rule.slot_minutes)
+    starts = []
+    for start, end in rule_intervals(rule, window_start, window_end):
+        while start + length <= end:
+            if window_start <= start < window_end:
+                starts.append(start)
+                if len(starts) == limit:
+                    return starts
+            start += length
+    return starts
+
+
+def subtract_intervals(intervals, busy):
+    """Remove sorted ``busy`` intervals from sorted disjoint ``intervals``."""
+    free = []
+    i = 0
+    for start, end in intervals:
+        # skip busy intervals that end before this one starts
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > start:
+                free.append([start, busy[j][0]])
+            start = max(start, busy[j][1])
+            j += 1
+        if start < end:
+            free.append([start, end])
+    return free
+
+
+def split_intervals(intervals, duration, window_start, window_end):
+    """Cut free intervals into back-to-back slots of ``duration`` that fall
+    inside [window_start, window_end)."""
+    slots = []
+    for start, end in intervals:
+        start = max(start, window_start)
+        end = min(end, window_end)
+        while start + duration <= end:
+            slots.append((start, start + duration))
+            start += duration
+    return slots
+
+
+def compute_free_slots(doctor_ids, window_start, window_end, duration):
+    """Free slots of ``duration`` for every doctor in ``doctor_ids``.
+
+    Runs three range queries for all doctors together (served by the
+    doctor_id-leading indexes): stored availability, recurring rules, which
+    are expanded here rather than materialized, and bookings. Each doctor's
+    sorted intervals are then swept once. Returns ``{doctor_id: [(start, end), ...]}``.
+    """
+    slot_length = timedelta(minutes=SLOT_MINUTES)
+    appointment_length = timedelta(minutes=APPOINTMENT_MINUTES)
+
+    available = db.session.execute(
+        db.select(Availability.doctor_id, Availability.date_time)
+        .where(
+            Availability.doctor_id.in_(doctor_ids),
+            Availability.date_time > window_start - slot_length,
+            Availability.date_time < window_end,
+        )
+        .order_by(Availability.doctor_id, Availability.date_time)
+    ).all()
+    rules = AvailabilityRule.query.filter(
+        AvailabilityRule.doctor_id.in_(doctor_ids),
+        AvailabilityRule.start_date <= window_end.date(),
+        or_(
+            AvailabilityRule.end_date.is_(None),
+            AvailabilityRule.end_date >= window_start.date(),
+        ),
+    ).all()
+    booked = db.session.execute(
+        db.select(Appointment.doctor_id, Appointment.date_time)
+        .where(
+            Appointment.doctor_id.in_(doctor_ids),
+            Appointment.date_time > window_start - appointment_length,
+            Appointment.date_time < window_end,
+            Appointment.holds_slot.is_not(None),
+        )
+        .order_by(Appointment.doctor_id, Appointment.date_time)
+    ).all()
+
+    busy_by_doctor = {
+        doctor_id: [[row.date_time, row.date_time + appointment_length] for row in rows]
+        for doctor_id, rows in groupby(booked, key=lambda row: row.doctor_id)
+    }
+
+    open_by_doctor = {doctor_id: [] for doctor_id in doctor_ids}
+    for row in available:
+        open_by_doctor[row.doctor_id].append(
+            [row.date_time, row.date_time + slot_length]
+        )
+    for rule in rules:
+        open_by_doctor[rule.doctor_id].extend(
+            rule_intervals(rule, window_start, window_end)
+        )
+
+    slots = {}
+    for doctor_id, intervals in open_by_doctor.items():
+        if rules:
+            intervals.sort()
+        free = subtract_intervals(
+            merge_intervals(intervals), busy_by_doctor.get(doctor_id, [])
+        )
+        slots[doctor_id] = split_intervals(free, duration, window_start, window_end)
+    return slots
@@ -0,0 +1,110 @@
+import click
+from flask import Flask
+
+from src.app import db
+
+
+@click.command("seed")
+@click.option("--doctors", default=50, show_default=True)
+@click.option("--clients", default=500, show_default=True)
+@click.option("--admins", default=1, show_default=True)
+@click.option("--availability", default=40, show_default=True, help="Slots per doctor.")
+@click.option(
+    "--appointments", default=20, show_default=True, help="Bookings per doctor."
+)
+@click.option("--password", default="secret", show_default=True)
+@click.option("--seed", "seed_value", default=0, show_default=True)
+@click.option("--reset", is_flag=True, help="Drop and recreate all tables first.")
+def seed_command(
+    doctors, clients, admins, availability, appointments, password, seed_value, reset
+):
+    """Bulk-generate a reproducible dataset (users, availability, appointments)."""
+    from src.helpers.seed import seed_database
+    from src.users.models import User
+
+    if appointments > availability:
+        raise click.BadParameter(
+            "cannot exceed --availability", param_hint="--appointments"
+        )
+    if reset:
+        db.drop_all()
+        db.create_all()
+    elif db.session.query(
+        User.query.filter(User.email.like("%@seed.io")).exists()
+    ).scalar():
+        raise click.ClickException("Database already seeded; pass --reset")
+
+    counts = seed_database(
+        doctors=doctors,
+        clients=clients,
+        admins=admins,
+        availability=availability,
+        appointments=appointments,
+        password=password,
+        seed=seed_value,
+    )
+    click.echo(", ".join(f"{count} {name}" for name, count in counts.items()))
+
+
+@click.command("advance-appointments")
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Rows per UPDATE transaction (APPOINTMENT_LIFECYCLE_CHUNK_SIZE, 500).",
+)
+@click.option(
+    "--pause",
+    type=click.FloatRange(min=0),
+    default=0,
+    show_default=True,
+    help="Seconds to wait between chunks.",
+)
+@click.option(
+    "--now",
+    type=click.DateTime(),
+    default=None,
+    help="Evaluate as of this UTC time instead of the current one.",
+)
+def advance_appointments_command(chunk_size, pause, now):
+    """Move past appointments to on-going or completed; run it from cron."""
+    from src.appointments.lifecycle import LIFECYCLE_CHUNK_SIZE, advance_appointments
+
+    counts = advance_appointments(
+        now=now, chunk_size=chunk_size or LIFECYCLE_CHUNK_SIZE, pause=pause
+    )
+    click.echo(", ".join(f"{count} {status}" for status, count in counts.items()))
+
+
+@click.command("backfill-daily-stats")
+@click.option(
+    "--from",
+    "first",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="First day to rebuild (default: the earliest).",
+)
+@click.option(
+    "--to",
+    "last",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last day to rebuild, inclusive (default: the latest).",
+)
+def backfill_daily_stats_command(first, last):
+    """Rebuild the admin analytics rollup from appointments and availability."""
+    from src.admin.analytics import backfill_daily_stats
+
+    if first and last and last < first:
+        raise click.BadParameter("must not be before --from", param_hint="--to")
+    rows = backfill_daily_stats(
+        first.date() if first else None, last.date() if last else None
+    )
+    db.session.commit()
+    click.echo(f"{rows} doctor-days written")
+
+
+def init_cli(app: Flask):
+    app.cli.add_command(seed_command)
+    app.cli.add_command(advance_appointments_command)
+    app.cli.add_command(backfill_daily_stats_command)
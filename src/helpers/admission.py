@@ -0,0 +1,279 @@
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import time
+from ctypes import c_double, c_longlong, c_uint64
+from multiprocessing.sharedctypes import RawArray
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+
+# Limits of the CPU-heavy endpoints, by endpoint name. ADMISSION_POLICIES (a
+# JSON object of the same shape) adds or replaces entries, e.g. for a list
+# endpoint, sized to the worker count; ``null`` drops one. Limits run before
+# the view, so cache hits and 304s of a limited endpoint count against them.
+#   concurrency: requests of the endpoint in progress at once, all workers
+#   rate, burst: token bucket per client (``key``: "ip" or "user"), i.e.
+#                sustained requests per second and how many may come at once
+DEFAULT_POLICIES = {
+    # password hashing; keep workers free for everything else
+    "auth.login": {"concurrency": 2, "rate": 1, "burst": 10, "key": "ip"},
+    "auth.signup": {"concurrency": 1, "rate": 0.2, "burst": 5, "key": "ip"},
+}
+
+COUNTERS = ("admitted", "rate_limited", "concurrency_limited")
+
+
+class AdmissionRejected(Exception):
+    """The request is over one of its endpoint's limits: 429 for the client's
+    rate, 503 for the endpoint's concurrency (or when the limits could not be
+    checked)."""
+
+    def __init__(self, status, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.message = message
+
+
+class Policy:
+    """Limits of one endpoint; ``None`` leaves that dimension unlimited."""
+
+    def __init__(self, concurrency=None, rate=None, burst=None, key="ip"):
+        if key not in ("ip", "user"):
+            raise ValueError(f"Unknown admission key {key!r}")
+        if burst is None and rate:
+            burst = max(1, rate)
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.key = key
+
+    def to_dict(self):
+        return {
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "burst": self.burst,
+            "key": self.key,
+        }
+
+
+def _fingerprint(client):
+    # not hash(): it must agree across processes; 0 marks an unused bucket
+    digest = hashlib.blake2b(client.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") | 1
+
+
+class AdmissionTable:
+    """Concurrency slots, token buckets and counters of every limited
+    endpoint, in shared memory.
+
+    Allocated by ``create_app``, so the workers gunicorn forks from a
+    ``--preload`` master share one table and one set of limits; otherwise
+    each worker enforces them on its own.
+
+    A slot holds the deadline of the request using it and frees itself after
+    ``hold`` seconds, so a worker killed mid-request gives it back. Each rate
+    limited endpoint has ``buckets`` buckets indexed by a hash of the client
+    key; a client whose bucket was taken over by another key starts again
+    with a full one, so collisions only ever let requests through. The lock
+    is held for a few array reads, so ``lock_timeout`` leaves room for
+    scheduling delays on a busy host; a request that still cannot get it is
+    turned away with a 503 rather than let past the limits, and counted in
+    ``lock_timeouts``.
+    """
+
+    def __init__(self, policies, buckets=4096, hold=60, lock_timeout=0.2):
+        self.policies = policies
+        self.buckets = buckets
+        self.hold = hold
+        self.lock_timeout = lock_timeout
+        self.pid = os.getpid()
+        self._lock = multiprocessing.Lock()
+        self._index = {endpoint: i for i, endpoint in enumerate(policies)}
+
+        self._slot_base, self._bucket_base = [], []
+        slots = buckets_total = 0
+        for policy in policies.values():
+            self._slot_base.append(slots)
+            slots += policy.concurrency or 0
+            self._bucket_base.append(buckets_total)
+            buckets_total += buckets if policy.rate else 0
+        self._slots = RawArray(c_double, max(slots, 1))
+        self._keys = RawArray(c_uint64, max(buckets_total, 1))
+        self._tokens = RawArray(c_double, max(buckets_total, 1))
+        self._stamps = RawArray(c_double, max(buckets_total, 1))
+        # COUNTERS per endpoint, then the lock timeouts
+        self._counters = RawArray(c_longlong, len(policies) * len(COUNTERS) + 1)
+
+    def _count(self, i, name):
+        self._counters[i * len(COUNTERS) + COUNTERS.index(name)] += 1
+
+    def _bucket(self, i, policy, client, now):
+        """Index and current token count of ``client``'s bucket."""
+        fingerprint = _fingerprint(client)
+        bucket = self._bucket_base[i] + fingerprint % self.buckets
+        if self._keys[bucket] != fingerprint:
+            return bucket, fingerprint, float(policy.burst)
+        refill = (now - self._stamps[bucket]) * policy.rate
+        return bucket, fingerprint, min(policy.burst, self._tokens[bucket] + refill)
+
+    def _take_slot(self, i, policy, now):
+        base = self._slot_base[i]
+        for slot in range(base, base + policy.concurrency):
+            if self._slots[slot] <= now:
+                self._slots[slot] = deadline = now + self.hold
+                return slot, deadline
+        return None
+
+    def admit(self, endpoint, client=None):
+        """Let one request of ``endpoint`` from ``client`` in, or raise
+        ``AdmissionRejected``. Returns the ticket to ``release`` when the
+        request is done (``None`` when it holds no slot)."""
+        i = self._index[endpoint]
+        policy = self.policies[endpoint]
+        now = time.monotonic()
+        if not self._lock.acquire(timeout=self.lock_timeout):
+            self._counters[-1] += 1
+            raise AdmissionRejected(503, 1, "Server is busy, try again shortly")
+        try:
+            if policy.rate:
+                bucket, fingerprint, tokens = self._bucket(i, policy, client, now)
+                if tokens < 1:
+                    self._count(i, "rate_limited")
+                    raise AdmissionRejected(
+                        429,
+                        math.ceil((1 - tokens) / policy.rate),
+                        "Too many requests, try again later",
+                    )
+            ticket = None
+            if policy.concurrency is not None:
+                ticket = self._take_slot(i, policy, now)
+                if ticket is None:
+                    self._count(i, "concurrency_limited")
+                    raise AdmissionRejected(503, 1, "Server is busy, try again shortly")
+            # a request turned away for concurrency keeps its token
+            if policy.rate:
+                self._keys[bucket] = fingerprint
+                self._tokens[bucket] = tokens - 1
+                self._stamps[bucket] = now
+            self._count(i, "admitted")
+            return ticket
+        finally:
+            self._lock.release()
+
+    def release(self, ticket):
+        slot, deadline = ticket
+        if not self._lock.acquire(timeout=self.lock_timeout):
+            self._counters[-1] += 1
+            return  # the slot frees itself at its deadline
+        try:
+            # unless it expired and another request holds it now
+            if self._slots[slot] == deadline:
+                self._slots[slot] = 0.0
+        finally:
+            self._lock.release()
+
+    def reset(self):
+        with self._lock:
+            for n in range(len(self._counters)):
+                self._counters[n] = 0
+
+    def to_dict(self):
+        now = time.monotonic()
+        endpoints = {}
+        for endpoint, i in self._index.items():
+            policy = self.policies[endpoint]
+            base = self._slot_base[i]
+            counts = self._counters[i * len(COUNTERS) : (i + 1) * len(COUNTERS)]
+            endpoints[endpoint] = {
+                **policy.to_dict(),
+                "in_flight": sum(
+                    self._slots[slot] > now
+                    for slot in range(base, base + (policy.concurrency or 0))
+                ),
+                **dict(zip(COUNTERS, counts)),
+            }
+        return {
+            "pid": os.getpid(),
+            # created in the gunicorn master and inherited by this worker
+            "shared": self.pid != os.getpid(),
+            "lock_timeouts": self._counters[-1],
+            "endpoints": endpoints,
+        }
+
+
+def _client_key(policy):
+    if policy.key == "user":
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme == "Bearer" and token:
+            try:
+                return f"user:{decode_token(token)['sub']}"
+            except (PyJWTError, JWTExtendedException):
+                pass  # bad or expired tokens are limited by address
+    return f"ip:{request.remote_addr}"
+
+
+def _admit():
+    table = current_app.extensions["admission"]
+    policy = table.policies.get(request.endpoint)
+    if policy is None or request.method == "OPTIONS":
+        return
+    client = _client_key(policy) if policy.rate else None
+    g.admission_ticket = table.admit(request.endpoint, client)
+
+
+def _release(exception):
+    ticket = g.pop("admission_ticket", None)
+    if ticket is not None:
+        current_app.extensions["admission"].release(ticket)
+
+
+def _rejected(e):
+    response = jsonify({"error": e.message})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, e.status
+
+
+def init_admission(app):
+    """Turn requests over the limits of ``DEFAULT_POLICIES`` and
+    ``ADMISSION_POLICIES`` away before their view runs (``ADMISSION_CONTROL``,
+    on by default except under ``TESTING``)."""
+    enabled = os.getenv("ADMISSION_CONTROL")
+    app.config.setdefault(
+        "ADMISSION_CONTROL",
+        not app.testing if enabled is None else enabled.lower() in ("1", "true", "yes"),
+    )
+    app.config.setdefault(
+        "ADMISSION_POLICIES", json.loads(os.getenv("ADMISSION_POLICIES", "{}"))
+    )
+    app.config.setdefault(
+        "ADMISSION_BUCKETS", int(os.getenv("ADMISSION_BUCKETS", 4096))
+    )
+    app.config.setdefault(
+        "ADMISSION_HOLD_SECONDS", int(os.getenv("ADMISSION_HOLD_SECONDS", 60))
+    )
+    if not app.config["ADMISSION_CONTROL"]:
+        return
+
+    policies = {**DEFAULT_POLICIES, **app.config["ADMISSION_POLICIES"]}
+    app.extensions["admission"] = AdmissionTable(
+        {
+            endpoint: Policy(**limits)
+            for endpoint, limits in policies.items()
+            if limits is not None
+        },
+        buckets=app.config["ADMISSION_BUCKETS"],
+        hold=app.config["ADMISSION_HOLD_SECONDS"],
+    )
+    app.before_request(_admit)
+    app.teardown_request(_release)
+    app.register_error_handler(AdmissionRejected, _rejected)
+
+
+def get_admission():
+    return current_app.extensions.get("admission")
@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import cache, wraps
+
+from flask import current_app, request
+
+from src.helpers.conditional import resource_version
+from src.helpers.streaming import wants_stream
+
+
+@cache
+def redis_errors():
+    """``(RedisError, WatchError)``, imported on first use: importing redis
+    takes longer than building the rest of the app, and only the redis
+    backends need it (falls back to ``OSError`` when it is not installed)."""
+    try:
+        from redis.exceptions import RedisError, WatchError
+    except ImportError:
+        return OSError, OSError
+    return RedisError, WatchError
+
+
+class CacheStats:
+    """Hit/miss/eviction counters of one worker's view of the cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.sets = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.errors = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def to_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "sets": self.sets,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "errors": self.errors,
+            }
+
+
+class LocalCache:
+    """In-process LRU with a per-entry TTL. Each worker has its own copy."""
+
+    backend = "local"
+
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.stats.add(expirations=1)
+                entry = None
+            if entry is None:
+                self.stats.add(misses=1)
+                return None
+            self._entries.move_to_end(key)
+        self.stats.add(hits=1)
+        return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        self.stats.add(sets=1, evictions=evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def to_dict(self):
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "backend": self.backend,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            **self.stats.to_dict(),
+        }
+
+
+class RedisCache:
+    """Cache shared by all workers in Redis (or anything speaking its
+    protocol). ``client`` is a ``redis.Redis``-compatible object, e.g.
+    ``fakeredis.FakeRedis()`` in tests. Redis evicts and expires on its own;
+    its counters are reported next to this worker's hits and misses. While
+    Redis is unreachable every lookup is a miss and requests hit the database.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, ttl=30, prefix="capstone:cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self._errors = redis_errors()[0]
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except self._errors:
+            self.stats.add(errors=1, misses=1)
+            return None
+        self.stats.add(**{"hits" if value is not None else "misses": 1})
+        return value
+
+    def set(self, key, value):
+        try:
+            self.client.set(self.prefix + key, value, ex=self.ttl)
+        except self._errors:
+            self.stats.add(errors=1)
+            return
+        self.stats.add(sets=1)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def to_dict(self):
+        try:
+            server = self.client.info("stats")
+        except Exception:
+            # fakes and some proxies do not implement INFO
+            server = {}
+        return {
+            "backend": self.backend,
+            "ttl": self.ttl,
+            **self.stats.to_dict(),
+            "server_evicted_keys": server.get("evicted_keys"),
+            "server_expired_keys": server.get("expired_keys"),
+        }
+
+
+def init_cache(app):
+    """Attach the read cache selected by ``CACHE_BACKEND`` (``local`` or
+    ``redis``); disabled when unset."""
+    app.config.setdefault("CACHE_BACKEND", os.getenv("CACHE_BACKEND", "").lower())
+    app.config.setdefault("CACHE_TTL", int(os.getenv("CACHE_TTL", 30)))
+    app.config.setdefault(
+        "CACHE_MAX_ENTRIES", int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+    )
+    app.config.setdefault(
+        "CACHE_REDIS_URL", os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    )
+
+    backend = app.config["CACHE_BACKEND"]
+    if backend == "local":
+        cache = LocalCache(
+            max_entries=app.config["CACHE_MAX_ENTRIES"], ttl=app.config["CACHE_TTL"]
+        )
+    elif backend == "redis":
+        client = app.config.get("CACHE_REDIS_CLIENT")
+        if client is None:
+            import redis
+
+            # a slow or unreachable cache must not stall requests
+            client = redis.Redis.from_url(
+                app.config["CACHE_REDIS_URL"],
+                socket_timeout=1,
+                socket_connect_timeout=1,
+            )
+        cache = RedisCache(client, ttl=app.config["CACHE_TTL"])
+    elif backend in ("", "none"):
+        return
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND {backend!r}")
+    app.extensions["cache"] = cache
+
+
+def get_cache():
+    return current_app.extensions.get("cache")
+
+
+def cached(name, scope=None):
+    """Serve a read view's 200 JSON body from the cache.
+
+    Entries are keyed by the current version of resource ``name``, so the
+    ``bump_version`` call in every write route invalidates them for all
+    workers at commit; superseded entries age out by TTL and LRU. ``scope``
+    returns what else the body depends on besides the URL (e.g. the doctor
+    whose rows a view is limited to). Streamed responses bypass the cache.
+    Place below ``jwt_required`` and ``role_required``.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None or wants_stream():
+                return view(*args, **kwargs)
+
+            version, _ = resource_version(name)
+            key = f"{name}:{version}:{scope() if scope else ''}:{request.full_path}"
+            body = cache.get(key)
+            if body is not None:
+                return current_app.response_class(body, mimetype="application/json")
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.set(key, response.get_data())
+            return response
+
+        return wrapper
+
+    return decorator
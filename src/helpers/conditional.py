@@ -0,0 +1,128 @@
+import hashlib
+import logging
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, request
+from flask_jwt_extended import current_user
+from sqlalchemy import Column, DateTime, Integer, String, event, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.http import is_resource_modified
+
+from src.app import db
+from src.helpers.streaming import NDJSON_MIMETYPE
+
+logger = logging.getLogger(__name__)
+
+# db.session.info key of the resource versions to bump once the write commits
+PENDING_KEY = "bumped_versions"
+
+# Versioned resources: their read endpoints answer conditional GETs and are
+# cached under the current version (see src.helpers.cache).
+DOCTORS = "doctors"
+AVAILABILITY = "availability"
+USERS = "users"
+
+
+class ResourceVersion(db.Model):
+    """A counter per resource, bumped in the same transaction as every write
+    that changes what the resource's list endpoint returns."""
+
+    __tablename__ = "resource_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+
+def bump_version(*names):
+    """Mark ``names`` as changed; call before the write's commit.
+
+    The counters move in a short transaction of their own right after that
+    commit, so a long write (e.g. a bulk insert) does not hold the shared
+    row of its resource locked and stall every other write to it. Until
+    then readers keep the old version, and so may cache the new rows under
+    it, which the bump then supersedes.
+    """
+    db.session.info.setdefault(PENDING_KEY, set()).update(names)
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_versions(session):
+    names = session.info.pop(PENDING_KEY, None)
+    if not names:
+        return
+    now = datetime.utcnow().replace(microsecond=0)
+    try:
+        with db.engine.begin() as connection:
+            for name in sorted(names):
+                result = connection.execute(
+                    update(ResourceVersion)
+                    .where(ResourceVersion.name == name)
+                    .values(version=ResourceVersion.version + 1, updated_at=now)
+                )
+                if not result.rowcount:
+                    # tables made by create_all() have no seeded rows
+                    connection.execute(
+                        insert(ResourceVersion).values(
+                            name=name, version=1, updated_at=now
+                        )
+                    )
+    except SQLAlchemyError:
+        # the write is committed; its readers stay on the old version (and
+        # cached bodies) until the next write to the resource
+        logger.exception("could not bump the versions of %s", sorted(names))
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_versions(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
+
+
+def resource_version(name):
+    """``(version, updated_at)`` of ``name``, read once per request."""
+    versions = g.setdefault("resource_versions", {})
+    if name not in versions:
+        row = db.session.get(ResourceVersion, name)
+        versions[name] = (row.version, row.updated_at) if row else (0, None)
+    return versions[name]
+
+
+def _etag(name, version):
+    # Same version, user, URL and body format means the same bytes.
+    ndjson = request.accept_mimetypes.best == NDJSON_MIMETYPE
+    key = f"{name}:{version}:{current_user.id}:{ndjson}:{request.full_path}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional(name):
+    """Serve ``If-None-Match`` for a list endpoint.
+
+    One primary-key read of ``name``'s version decides whether the client's
+    copy is current; if so the view is skipped and a 304 goes out without
+    touching the resource's table. Otherwise the view runs and its 200
+    response carries a strong ETag. There is no ``Last-Modified``: two
+    writes within the same second would look alike to ``If-Modified-Since``.
+    Place below ``jwt_required`` and ``role_required``.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, _ = resource_version(name)
+            etag = _etag(name, version)
+
+            if not is_resource_modified(request.environ, etag=etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.vary.update(("Accept", "Authorization"))
+            return response
+
+        return wrapper
+
+    return decorator
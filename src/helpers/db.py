@@ -1,19 +1,268 @@
 import os
+import random
+import threading
+import time
 
-from flask import Flask
-from flask_migrate import Migrate
+import jwt
+from flask import Flask, current_app, g, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 
+# Requests whose statements may be answered by a replica.
+READ_METHODS = ("GET", "HEAD")
+# Session.info flag: this transaction wrote, so it reads from the primary.
+WROTE_KEY = "db_wrote"
 
-def init_db(app: Flask, db: SQLAlchemy):
+
+class PoolStats:
+    """Checkout counters of one worker process's connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.max_in_use = 0
+
+    def record_checkout(self, wait, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.max_in_use = max(self.max_in_use, in_use)
+
+    def record_timeout(self, wait):
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "max_in_use": self.max_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": (
+                    self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0
+                ),
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection
+    (including the pre-ping) and how many were in use at once."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_stats.record_timeout(time.perf_counter() - started)
+            raise
+        pool_stats.record_checkout(time.perf_counter() - started, self.checkedout())
+        return connection
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def engine_options(uri):
+    """Engine options from the DB_POOL_* environment variables.
+
+    In-memory SQLite keeps Flask-SQLAlchemy's single shared connection, so
+    only pre-ping applies there.
+    """
+    options = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True)}
+
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", 10)),
+        # below MySQL's wait_timeout so idle connections are replaced before
+        # the server drops them
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    )
+    return options
+
+
+def database_url():
     DB_PASS = os.getenv("MYSQL_ROOT_PASSWORD")
     DB_PORT = os.getenv("MYSQL_PORT")
     DB_HOST = os.getenv("MYSQL_HOST")
     DB_DB = os.getenv("MYSQL_DATABASE")
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = (
-        f"mysql+pymysql://root:{ DB_PASS }@{DB_HOST}:{DB_PORT}/{DB_DB}"
+    # DATABASE_URL points the app at any other database, e.g. a local
+    # sqlite:///dev.db stand-in for MySQL during tests
+    return os.getenv(
+        "DATABASE_URL",
+        f"mysql+pymysql://root:{ DB_PASS }@{DB_HOST}:{DB_PORT}/{DB_DB}",
+    )
+
+
+def reads_primary(view):
+    """Keep a GET view on the primary, for reads that must not lag behind a
+    write (e.g. the users row checked by a token refresh)."""
+    view.reads_primary = True
+    return view
+
+
+def _is_replica_read(clause):
+    return (
+        getattr(clause, "is_select", False)
+        and getattr(clause, "_for_update_arg", None) is None
+    )
+
+
+class RoutingSession(Session):
+    """Session that answers the SELECTs of GET requests from the replica the
+    request was given (``g.db_replica``, see ``init_db``).
+
+    Flushes, DML and ``SELECT ... FOR UPDATE`` always go to the primary, and
+    once a transaction has written, its later reads follow it there.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info[WROTE_KEY] = True
+            elif (
+                _is_replica_read(clause)
+                and not self.info.get(WROTE_KEY)
+                and has_request_context()
+                and g.get("db_replica") is not None
+            ):
+                return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _token_subject():
+    """``sub`` of the request's bearer token, read without verifying it: it
+    only decides where reads go, never what the caller may see."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme != "Bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("sub")
+    except jwt.PyJWTError:
+        return None
+
+
+def _pins():
+    """Users who wrote within ``DB_READ_YOUR_WRITES_SECONDS``; kept in Redis
+    next to the read cache when ``CACHE_BACKEND=redis`` so every worker sees
+    them, otherwise in this worker only."""
+    pins = current_app.extensions.get("db_pins")
+    if pins is None:
+        from src.helpers.cache import LocalCache, RedisCache, get_cache
+
+        ttl = current_app.config["DB_READ_YOUR_WRITES_SECONDS"]
+        cache = get_cache()
+        if isinstance(cache, RedisCache):
+            pins = RedisCache(cache.client, ttl=ttl, prefix="capstone:db-pin:")
+        else:
+            pins = LocalCache(max_entries=100_000, ttl=ttl)
+        pins = current_app.extensions.setdefault("db_pins", pins)
+    return pins
+
+
+def _choose_replica():
+    replicas = current_app.extensions["db_replicas"]
+    if request.method not in READ_METHODS:
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, "reads_primary", False):
+        return
+    subject = _token_subject()
+    if (
+        subject is not None
+        and current_app.config["DB_READ_YOUR_WRITES_SECONDS"]
+        and _pins().get(str(subject)) is not None
+    ):
+        return
+    g.db_replica = random.choice(replicas)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer(session):
+    if not session.info.pop(WROTE_KEY, False) or not has_request_context():
+        return
+    if not current_app.extensions.get("db_replicas"):
+        return
+    subject = _token_subject()
+    if subject is not None and current_app.config["DB_READ_YOUR_WRITES_SECONDS"]:
+        _pins().set(str(subject), b"1")
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _forget_writes(session, previous_transaction):
+    session.info.pop(WROTE_KEY, None)
+
+
+def init_db(app: Flask, db: SQLAlchemy):
+    """Configure the primary database and, with ``DATABASE_REPLICA_URLS``
+    (comma-separated), read replicas as binds ``replica0``, ``replica1``...
+
+    ``db`` must use ``RoutingSession``. With replicas, each GET request reads
+    from one picked at random, unless its view is ``@reads_primary`` or its
+    token's user committed a write in the last
+    ``DB_READ_YOUR_WRITES_SECONDS`` (default 5) and so must see it.
+    """
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", database_url())
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        engine_options(app.config["SQLALCHEMY_DATABASE_URI"]),
+    )
+    app.config.setdefault(
+        "SQLALCHEMY_REPLICA_URIS",
+        [
+            url.strip()
+            for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+            if url.strip()
+        ],
+    )
+    app.config.setdefault(
+        "DB_READ_YOUR_WRITES_SECONDS",
+        int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", 5)),
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    replicas = []
+    for number, uri in enumerate(app.config["SQLALCHEMY_REPLICA_URIS"]):
+        replicas.append(f"replica{number}")
+        binds[replicas[-1]] = {"url": uri, **engine_options(uri)}
+    app.extensions["db_replicas"] = replicas
+
     db.init_app(app)
-    migrate = Migrate(app, db)
+    if replicas:
+        app.before_request(_choose_replica)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        # `flask db ...` needs Flask-Migrate, which imports all of alembic;
+        # the app servers never run migrations, so they skip that import
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
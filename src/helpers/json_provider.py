@@ -0,0 +1,36 @@
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """``app.json`` backed by orjson.
+
+    Produces the same documents as Flask's provider: keys sorted, dates as
+    HTTP dates (through ``default``), indented in debug mode. Non-ASCII text
+    is written as UTF-8 instead of ``\\u`` escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def init_json(app):
+    """Use orjson for ``jsonify`` and streamed bodies unless ``JSON_PROVIDER``
+    is ``default`` or orjson is not installed."""
+    app.config.setdefault("JSON_PROVIDER", os.getenv("JSON_PROVIDER", "orjson"))
+    if app.config["JSON_PROVIDER"] == "orjson" and orjson is not None:
+        app.json = ORJSONProvider(app)
@@ -1,12 +1,50 @@
 import os
 from datetime import timedelta
 
-from flask import jsonify
+from flask import abort, g, jsonify
 from flask_jwt_extended import JWTManager
 
 
+def jwt_secret_key():
+    # read when the app is created, after the entry point has loaded .env
+    return os.getenv("JWT_SECRET_KEY", "super-secret-key")
+
+
+def token_claims(user):
+    """Extra claims of every token issued to ``user``: its role, and the
+    security version that ``revoke_user_tokens`` moves past."""
+    return {"role": user.role, "sv": user.security_version or 0}
+
+
+class TokenUser:
+    """The caller as described by the token's claims, standing in for the
+    users row so that authorization needs no query. Any attribute besides
+    ``id`` and ``role`` loads the row on first use.
+    """
+
+    # blocking a user revokes their tokens, so a valid token is never blocked
+    blocked = False
+
+    def __init__(self, user_id, role):
+        self.id = user_id
+        self.role = role
+        self._user = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._user is None:
+            from src.app import db
+            from src.users.models import User
+
+            self._user = db.session.get(User, self.id)
+            if self._user is None:
+                abort(404, "User not found")
+        return getattr(self._user, name)
+
+
 def init_jwt(app):
-    app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "super-secret-key")
+    app.config["JWT_SECRET_KEY"] = jwt_secret_key()
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=1)  # 1 hour expiry
     app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=7)  # 7 days expiry
     app.config["JWT_TOKEN_LOCATION"] = ["headers"]  # Default: Authorization Header
@@ -22,6 +60,32 @@ def init_jwt(app):
     def handle_no_authorization_error(e):
         return jsonify({"error": "Authorization token is missing or invalid"}), 401
 
+    # ✅ Resolve the token's user once per request; shared via `current_user`
+    @jwt.user_lookup_loader
+    def user_lookup_callback(_jwt_header, jwt_data):
+        from src.app import db
+        from src.users.models import User
+
+        # loaded by the revocation check while its store was unreachable
+        user = g.pop("token_user", None)
+        if user is not None:
+            return user
+        if "role" in jwt_data:
+            return TokenUser(int(jwt_data["sub"]), jwt_data["role"])
+        # tokens issued before the role claim existed
+        return db.session.get(User, int(jwt_data["sub"]))
+
+    # ✅ Reject logged-out tokens and tokens of blocked or changed users
+    @jwt.token_in_blocklist_loader
+    def token_in_blocklist_callback(_jwt_header, jwt_data):
+        from src.helpers.revocation import is_token_revoked
+
+        return is_token_revoked(jwt_data)
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(_jwt_header, _jwt_data):
+        return jsonify({"error": "User not found"}), 404
+
     # ✅ Catch-all error handler for other HTTP errors
     @app.errorhandler(HTTPException)
     def handle_http_exception(e):
@@ -0,0 +1,84 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values) -> str:
+    """Encode the keyset position (sort key values) of the last row of a page."""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            (
+                datetime.fromisoformat(value)
+                if column.type.python_type is datetime
+                else column.type.python_type(value)
+            )
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def after(columns, values):
+    """SQL condition selecting rows that sort strictly after ``values``."""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column > values[i]))
+    return or_(*clauses)
+
+
+def keyset_bound(query, columns, limit=DEFAULT_PAGE_SIZE):
+    """Sort key values of the ``limit``-th row of ``query``, or None when no
+    row follows it. Lets a streamed page cap its rows and name the next cursor
+    before it sends any, reading two index entries instead of the page."""
+    rows = query.with_entities(*columns).order_by(*columns)
+    rows = rows.offset(limit - 1).limit(2).all()
+    return list(rows[0]) if len(rows) == 2 else None
+
+
+def keyset_select(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Narrow ``query`` (a legacy ``Query`` or a ``select()``) to the page after
+    ``cursor``; run it and pass the rows to ``keyset_page``."""
+    if cursor:
+        query = query.filter(after(columns, decode_cursor(cursor, columns)))
+    return query.order_by(*columns).limit(limit + 1)
+
+
+def keyset_page(rows, columns, limit=DEFAULT_PAGE_SIZE):
+    """Split the rows of a ``keyset_select`` into the page and the next cursor."""
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], c.key) for c in columns])
+
+
+def keyset_paginate(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of ``query`` ordered by ``columns`` and the cursor for the
+    next page (None on the last page). The last column must be unique.
+
+    Rows are fetched with ``limit + 1`` so the presence of a next page is known
+    without a separate COUNT.
+    """
+    rows = keyset_select(query, columns, cursor, limit).all()
+    return keyset_page(rows, columns, limit)
@@ -0,0 +1,98 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+# Stored hashes made with any other method are upgraded on the next login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+# Processes in each worker's KDF pool; 0 hashes inline in the request worker.
+# A sync worker serves one request at a time and so never uses more than one;
+# raise it for threaded workers.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 1))
+
+# How long (seconds) a caller waits for its hash before giving up.
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing pool is saturated or failed; the caller should retry later."""
+
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+def _get_pool():
+    """Process pool owned by the current process.
+
+    Created lazily and re-created after a fork, so a pool made in a
+    ``--preload`` master is never shared with the workers.
+    """
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _drop_pool(pool):
+    """Forget ``pool`` after one of its processes died, so that the next call
+    starts a fresh one instead of failing until the worker restarts."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(func, *args):
+    """Run a KDF call in this process's pool.
+
+    The pool belongs to one worker and bounds nothing across workers: how
+    many logins and signups hash at once server-wide is capped by admission
+    control (``src.helpers.admission``).
+    """
+    if PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+
+    pool = _get_pool()
+    try:
+        future = pool.submit(func, *args)
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        # a job still queued is dropped, so abandoned hashes cannot pile up
+        future.cancel()
+        raise PasswordHashingBusy("Password hashing timed out")
+    except BrokenProcessPool:
+        # a pool process crashed or was killed (e.g. by the OOM killer)
+        _drop_pool(pool)
+        raise PasswordHashingBusy("Password hashing pool failed")
+
+
+def hash_password(password: str) -> str:
+    return _run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def check_password(pwhash: str, password: str) -> bool:
+    return _run(check_password_hash, pwhash, password)
+
+
+@lru_cache(maxsize=1)
+def _current_method():
+    # werkzeug fills in defaults ("scrypt" -> "scrypt:32768:8:1"), so read the
+    # full method back from a hash instead of trusting the configured string
+    return generate_password_hash("", PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+
+def needs_rehash(pwhash: str) -> bool:
+    """True when ``pwhash`` was made with other parameters than the current
+    ``PASSWORD_HASH_METHOD``."""
+    return pwhash.split("$", 1)[0] != _current_method()
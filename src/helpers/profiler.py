@@ -0,0 +1,195 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+# A SELECT repeated this many times in one request is reported as N+1.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_PROFILER_N_PLUS_ONE", 5))
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare how many SQL statements a view may issue per request, the JWT
+    user lookup included. Enforced when SQL_QUERY_BUDGETS is on (the default
+    under TESTING). Checked when the view returns, so the statements a
+    streamed body runs while it is sent are not counted."""
+
+    def decorator(func):
+        func.query_budget = max_queries
+        return func
+
+    return decorator
+
+
+_PARAM = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})+\s*\)")
+
+
+def _shape(statement):
+    # IN lists expanded by the driver would otherwise make every call unique
+    return _PLACEHOLDER_LIST.sub("(?...)", " ".join(statement.split()))
+
+
+class RequestProfile:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[_shape(statement)] += 1
+
+    def n_plus_one(self):
+        return [
+            (shape, count)
+            for shape, count in self.shapes.items()
+            if count >= N_PLUS_ONE_THRESHOLD and shape.startswith("SELECT")
+        ]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_time = 0.0
+        self.max_db_time = 0.0
+        self.n_plus_one_requests = 0
+        self.n_plus_one_shapes = Counter()
+
+    def add(self, profile):
+        self.requests += 1
+        self.queries += profile.count
+        self.max_queries = max(self.max_queries, profile.count)
+        self.db_time += profile.duration
+        self.max_db_time = max(self.max_db_time, profile.duration)
+        suspects = profile.n_plus_one()
+        if suspects:
+            self.n_plus_one_requests += 1
+            for shape, count in suspects:
+                self.n_plus_one_shapes[shape] = max(
+                    self.n_plus_one_shapes[shape], count
+                )
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "avg_queries": self.queries / self.requests if self.requests else 0,
+            "max_queries": self.max_queries,
+            "avg_db_ms": self.db_time / self.requests * 1000 if self.requests else 0,
+            "max_db_ms": self.max_db_time * 1000,
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "n_plus_one": [
+                {"statement": shape, "max_repeats": count}
+                for shape, count in self.n_plus_one_shapes.most_common(5)
+            ],
+        }
+
+
+class SQLProfiler:
+    """Per-request SQL statistics aggregated per endpoint for this worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(EndpointStats)
+
+    def add(self, endpoint, profile):
+        with self._lock:
+            self._stats[endpoint].add(profile)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "endpoints": {
+                    endpoint: stats.to_dict()
+                    for endpoint, stats in sorted(self._stats.items())
+                },
+            }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_profiler_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["sql_profiler_started"].pop()
+    if has_app_context():
+        profile = g.get("sql_profile")
+        if profile is not None:
+            profile.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("sql_profiler_started"):
+        conn.info["sql_profiler_started"].pop()
+
+
+def init_profiler(app, db):
+    """Opt-in SQL instrumentation (SQL_PROFILER=1) and query budget checks
+    (SQL_QUERY_BUDGETS, on by default when TESTING)."""
+    app.config.setdefault(
+        "SQL_PROFILER", os.getenv("SQL_PROFILER", "").lower() in ("1", "true", "yes")
+    )
+    budgets = os.getenv("SQL_QUERY_BUDGETS")
+    app.config.setdefault(
+        "SQL_QUERY_BUDGETS",
+        app.testing if budgets is None else budgets.lower() in ("1", "true", "yes"),
+    )
+    if not (app.config["SQL_PROFILER"] or app.config["SQL_QUERY_BUDGETS"]):
+        return
+
+    profiler = SQLProfiler()
+    app.extensions["sql_profiler"] = profiler
+
+    with app.app_context():
+        # the primary and any read replicas
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def start_sql_profile():
+        g.sql_profile = RequestProfile()
+
+    @app.after_request
+    def finish_sql_profile(response):
+        profile = g.pop("sql_profile", None)
+        if profile is None or request.endpoint is None:
+            return response
+
+        if current_app.config["SQL_PROFILER"]:
+            profiler.add(request.endpoint, profile)
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", None)
+        if (
+            current_app.config["SQL_QUERY_BUDGETS"]
+            and budget is not None
+            and profile.count > budget
+        ):
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.path} issued {profile.count} queries, "
+                f"budget is {budget}"
+            )
+        return response
+
+
+def get_profiler():
+    return current_app.extensions.get("sql_profiler")
@@ -0,0 +1,34 @@
+from datetime import date
+
+from src.app import db
+
+
+class Projection:
+    """A fixed set of model columns serialized straight from result rows.
+
+    ``query()`` selects only those columns, so rows come back as tuples:
+    no ORM instances, identity map or attribute instrumentation. ``to_dict``
+    must produce what the model's ``to_dict`` does for the same fields.
+    """
+
+    def __init__(self, model, fields):
+        self.keys = tuple(fields)
+        self.columns = [getattr(model, field) for field in fields]
+        self._dates = [
+            i
+            for i, column in enumerate(self.columns)
+            if issubclass(column.type.python_type, date)
+        ]
+
+    def query(self):
+        """Legacy ``Query`` of row tuples; filter, order and page it as usual."""
+        return db.session.query(*self.columns)
+
+    def to_dict(self, row):
+        if not self._dates:
+            return dict(zip(self.keys, row))
+        values = list(row)
+        for i in self._dates:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        return dict(zip(self.keys, values))
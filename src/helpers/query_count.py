@@ -0,0 +1,48 @@
+from contextlib import ExitStack, contextmanager
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Collects the SQL statements an engine executes while it is attached."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(*engines):
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", counter)
+            stack.callback(event.remove, engine, "before_cursor_execute", counter)
+        yield counter
+
+
+def assert_query_count(client, method, url, expected, **kwargs):
+    """Send one request through a Flask test client and assert it ran exactly
+    ``expected`` SQL statements on any engine, those of a streamed body
+    included. Returns the response for further checks.
+    """
+    from src.app import db
+
+    with client.application.app_context():
+        engines = list(db.engines.values())
+
+    with count_queries(*engines) as counter:
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()
+
+    assert counter.count == expected, (
+        f"{method} {url}: expected {expected} queries, got {counter.count}:\n"
+        + "\n".join(counter.statements)
+    )
+    return response
@@ -0,0 +1,307 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g, request
+from sqlalchemy import Column, DateTime, String, delete, event
+
+from src.app import db
+from src.helpers.cache import redis_errors
+from src.helpers.db import READ_METHODS
+
+logger = logging.getLogger(__name__)
+
+# db.session.info key of the user revocations waiting for the commit
+PENDING_KEY = "revoked_users"
+
+
+class RevokedToken(db.Model):
+    """A refresh token ended by logout. Kept in the database because
+    ``/auth/refresh`` in every worker checks it, whatever the store."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(36), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RevocationStoreUnavailable(Exception):
+    """The shared store could not be reached; decide from the database."""
+
+
+class RevocationStats:
+    """Check/rejection/error counters of one worker's view of the store."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.rejections = 0
+        self.errors = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "checks": self.checks,
+                "rejections": self.rejections,
+                "errors": self.errors,
+            }
+
+
+def revoked_by_version(claims, min_version):
+    """True when ``claims`` predate the user's last revocation: the token's
+    ``sv`` is below ``min_version`` (None when the user was never revoked)."""
+    return min_version is not None and claims.get("sv", 0) < min_version
+
+
+def revoke_refresh_token(claims):
+    """Record the refresh token of ``claims`` as revoked, to be committed by
+    the caller; rows of tokens that have expired since are dropped."""
+    now = datetime.utcnow()
+    db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+    db.session.merge(
+        RevokedToken(
+            jti=claims["jti"], expires_at=datetime.utcfromtimestamp(claims["exp"])
+        )
+    )
+
+
+def refresh_token_revoked(claims):
+    return db.session.get(RevokedToken, claims["jti"]) is not None
+
+
+def revoked_by_user(claims, user):
+    """The database's verdict on ``claims``: the users row is gone, blocked
+    or has moved past the token's security version."""
+    return (
+        user is None
+        or user.blocked
+        or claims.get("sv", 0) < (user.security_version or 0)
+    )
+
+
+class MemoryRevocationStore:
+    """Revoked token ids and user security versions in this process. Each
+    worker has its own copy and loses it on restart, so use it with a single
+    worker; refresh still checks the database (the users row and the
+    refresh tokens ended by logout), which bounds what another worker misses
+    to one access-token lifetime.
+    """
+
+    backend = "memory"
+
+    def __init__(self):
+        self.stats = RevocationStats()
+        self._lock = threading.Lock()
+        self._tokens = {}  # jti -> expires at (epoch seconds)
+        self._users = {}  # user id -> (min security version, expires at)
+
+    def _prune(self, now):
+        self._tokens = {k: exp for k, exp in self._tokens.items() if exp > now}
+        self._users = {k: v for k, v in self._users.items() if v[1] > now}
+
+    def revoke_token(self, jti, expires_at):
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._tokens[jti] = expires_at
+
+    def revoke_user(self, user_id, version, ttl):
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            current = self._users.get(str(user_id))
+            if current is None or current[0] < version:
+                self._users[str(user_id)] = (version, now + ttl)
+
+    def is_revoked(self, claims):
+        now = time.time()
+        with self._lock:
+            token_expires = self._tokens.get(claims["jti"])
+            user = self._users.get(claims["sub"])
+        revoked = (token_expires is not None and token_expires > now) or (
+            user is not None and user[1] > now and revoked_by_version(claims, user[0])
+        )
+        self.stats.add(checks=1, rejections=int(revoked))
+        return revoked
+
+    def to_dict(self):
+        with self._lock:
+            tokens, users = len(self._tokens), len(self._users)
+        return {
+            "backend": self.backend,
+            "revoked_tokens": tokens,
+            "revoked_users": users,
+            **self.stats.to_dict(),
+        }
+
+
+class RedisRevocationStore:
+    """Revocations shared by all workers in Redis. ``client`` is a
+    ``redis.Redis``-compatible object. Every check is one MGET; keys expire
+    with the tokens they can still reject.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, prefix="capstone:revoked:"):
+        self.client = client
+        self.prefix = prefix
+        self.stats = RevocationStats()
+        self._errors, self._watch_error = redis_errors()
+
+    def _token_key(self, jti):
+        return f"{self.prefix}jti:{jti}"
+
+    def _user_key(self, user_id):
+        return f"{self.prefix}user:{user_id}"
+
+    def revoke_token(self, jti, expires_at):
+        ttl = max(1, int(expires_at - time.time()) + 1)
+        try:
+            self.client.set(self._token_key(jti), 1, ex=ttl)
+        except self._errors as e:
+            self.stats.add(errors=1)
+            raise RevocationStoreUnavailable from e
+
+    def revoke_user(self, user_id, version, ttl):
+        key = self._user_key(user_id)
+        try:
+            with self.client.pipeline() as pipe:
+                while True:
+                    try:
+                        # never lower a version a concurrent revocation set
+                        pipe.watch(key)
+                        current = pipe.get(key)
+                        if current is not None and int(current) >= version:
+                            return
+                        pipe.multi()
+                        pipe.set(key, version, ex=int(ttl))
+                        pipe.execute()
+                        return
+                    except self._watch_error:
+                        continue
+        except self._errors as e:
+            self.stats.add(errors=1)
+            raise RevocationStoreUnavailable from e
+
+    def is_revoked(self, claims):
+        try:
+            token, version = self.client.mget(
+                self._token_key(claims["jti"]), self._user_key(claims["sub"])
+            )
+        except self._errors as e:
+            self.stats.add(errors=1)
+            raise RevocationStoreUnavailable from e
+        revoked = token is not None or revoked_by_version(
+            claims, None if version is None else int(version)
+        )
+        self.stats.add(checks=1, rejections=int(revoked))
+        return revoked
+
+    def to_dict(self):
+        return {"backend": self.backend, **self.stats.to_dict()}
+
+
+def init_revocation(app):
+    """Attach the token revocation store selected by ``REVOCATION_BACKEND``
+    (``memory`` or ``redis``)."""
+    app.config.setdefault(
+        "REVOCATION_BACKEND", os.getenv("REVOCATION_BACKEND", "memory").lower()
+    )
+    app.config.setdefault(
+        "REVOCATION_REDIS_URL",
+        os.getenv("REVOCATION_REDIS_URL", "redis://localhost:6379/0"),
+    )
+
+    backend = app.config["REVOCATION_BACKEND"]
+    if backend == "memory":
+        store = MemoryRevocationStore()
+    elif backend == "redis":
+        client = app.config.get("REVOCATION_REDIS_CLIENT")
+        if client is None:
+            import redis
+
+            # a slow store must not stall every authenticated request
+            client = redis.Redis.from_url(
+                app.config["REVOCATION_REDIS_URL"],
+                socket_timeout=1,
+                socket_connect_timeout=1,
+            )
+        store = RedisRevocationStore(client)
+    else:
+        raise ValueError(f"Unknown REVOCATION_BACKEND {backend!r}")
+    app.extensions["revocation"] = store
+
+
+def get_revocation_store():
+    return current_app.extensions["revocation"]
+
+
+def is_token_revoked(claims):
+    """Blocklist check of Flask-JWT-Extended; falls back to the users row
+    while the store is unreachable. With the per-worker memory store, writes
+    check the row as well: a block made in another worker is not in this
+    worker's store, and the blocked user must not get to undo it."""
+    store = get_revocation_store()
+    try:
+        if store.is_revoked(claims):
+            return True
+    except RevocationStoreUnavailable:
+        return _revoked_by_row(claims)
+    if store.backend == "memory" and request.method not in READ_METHODS:
+        return _revoked_by_row(claims)
+    return False
+
+
+def _revoked_by_row(claims):
+    from src.users.models import User
+
+    # hold on to the row for the user lookup that follows
+    g.token_user = db.session.get(User, int(claims["sub"]))
+    return revoked_by_user(claims, g.token_user)
+
+
+def revoke_user_tokens(user):
+    """Invalidate every token issued to ``user`` so far.
+
+    Bumps the row's security version, to be committed with the change that
+    caused it (block, role change, deletion); the store learns the new
+    version once that commit succeeds.
+    """
+    user.security_version = (user.security_version or 0) + 1
+    publish_on_commit(user.id, user.security_version)
+
+
+def publish_on_commit(user_id, version):
+    """Tell the store that ``user_id`` moved to security ``version`` once the
+    current transaction commits (for set-based updates of the column)."""
+    db.session.info.setdefault(PENDING_KEY, {})[user_id] = version
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_revocations(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    store = get_revocation_store()
+    # a user entry must outlive every token it can still reject
+    ttl = current_app.config["JWT_REFRESH_TOKEN_EXPIRES"].total_seconds()
+    for user_id, version in pending.items():
+        try:
+            store.revoke_user(user_id, version, ttl)
+        except RevocationStoreUnavailable:
+            # the database has the new version; refresh already honours it
+            logger.error("could not publish revocation of user %s", user_id)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_revocations(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,124 @@
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from src.app import db
+from src.helpers import passwords
+
+FIRST_NAMES = ["Ada", "Ben", "Chloe", "Dev", "Elif", "Farid", "Grace", "Hiro"]
+LAST_NAMES = ["Smith", "Khan", "Garcia", "Chen", "Okafor", "Novak", "Silva", "Ito"]
+SPECIALTIES = ["cardiology", "dermatology", "pediatrics", "neurology", "dentistry"]
+
+# Rows per INSERT; keeps statements well under MySQL's max_allowed_packet.
+CHUNK_SIZE = 5000
+
+
+def _insert(model, rows):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(insert(model), rows[i : i + CHUNK_SIZE])
+
+
+def _people(role, count, rng, password_hash):
+    return [
+        {
+            "role": role,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": f"{rng.choice(LAST_NAMES)}{i}",
+            "address": f"{i} Seed Street",
+            "profile_desc": (
+                f"{rng.choice(SPECIALTIES)} specialist" if role == "doctor" else None
+            ),
+            "email": f"{role}{i}@seed.io",
+            "password_hash": password_hash,
+            "status": "available",
+            "blocked": False,
+        }
+        for i in range(count)
+    ]
+
+
+def seed_database(
+    doctors=50,
+    clients=500,
+    admins=1,
+    availability=40,
+    appointments=20,
+    start=datetime(2030, 1, 7, 9),
+    password="secret",
+    seed=0,
+):
+    """Bulk-insert a reproducible dataset into the current database.
+
+    ``availability`` and ``appointments`` are per doctor; slots are laid out
+    eight a day from ``start`` and appointments take a random subset of them.
+    The same ``seed`` always produces the same rows. Every user gets
+    ``password``, hashed once. Returns the row counts.
+    """
+    from src.admin.analytics import backfill_daily_stats
+    from src.appointments.models import RELEASED_STATUSES, Appointment
+    from src.availability.models import Availability
+    from src.helpers.conditional import AVAILABILITY, DOCTORS, USERS, bump_version
+    from src.users.models import User
+
+    if appointments > availability:
+        raise ValueError("appointments per doctor cannot exceed availability")
+
+    rng = random.Random(seed)
+    password_hash = passwords.hash_password(password)
+    _insert(
+        User,
+        _people("admin", admins, rng, password_hash)
+        + _people("doctor", doctors, rng, password_hash)
+        + _people("client", clients, rng, password_hash),
+    )
+
+    seeded = User.email.like("%@seed.io")
+    doctor_ids = db.session.scalars(
+        select(User.id).where(User.role == "doctor", seeded).order_by(User.id)
+    ).all()
+    client_ids = db.session.scalars(
+        select(User.id).where(User.role == "client", seeded).order_by(User.id)
+    ).all()
+
+    slots = [
+        start + timedelta(days=n // 8, minutes=30 * (n % 8))
+        for n in range(availability)
+    ]
+    availability_rows = []
+    appointment_rows = []
+    for doctor_id in doctor_ids:
+        availability_rows.extend(
+            {"doctor_id": doctor_id, "date_time": slot} for slot in slots
+        )
+        if not client_ids:
+            continue
+        for slot in sorted(rng.sample(slots, appointments)):
+            status = rng.choices(
+                ["up-coming", "completed", "canceled"], weights=[8, 1, 1]
+            )[0]
+            appointment_rows.append(
+                {
+                    "user_id": rng.choice(client_ids),
+                    "doctor_id": doctor_id,
+                    "date_time": slot,
+                    "status": status,
+                    "client_requirements": None,
+                    # bulk inserts skip the @validates hook that sets this
+                    "holds_slot": None if status in RELEASED_STATUSES else True,
+                }
+            )
+    _insert(Availability, availability_rows)
+    _insert(Appointment, appointment_rows)
+
+    bump_version(USERS, DOCTORS, AVAILABILITY)
+    # bulk inserts bypass the routes that keep the rollup current
+    backfill_daily_stats()
+    db.session.commit()
+    return {
+        "admins": admins,
+        "doctors": len(doctor_ids),
+        "clients": len(client_ids),
+        "availability": len(availability_rows),
+        "appointments": len(appointment_rows),
+    }
@@ -0,0 +1,118 @@
+import logging
+import os
+import time
+from datetime import timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from src.app import db
+from src.helpers.db import pool_stats
+
+logger = logging.getLogger(__name__)
+
+
+def init_warmup(app):
+    """Read the warm-up settings of ``warm_up``: ``WARMUP`` turns it off,
+    ``WARMUP_CONNECTIONS`` is how many pool connections to open (default:
+    the pool size) and ``WARMUP_PATHS`` the ``role:path`` GETs to send."""
+    app.config.setdefault(
+        "WARMUP", os.getenv("WARMUP", "1").lower() in ("1", "true", "yes")
+    )
+    app.config.setdefault("WARMUP_CONNECTIONS", os.getenv("WARMUP_CONNECTIONS"))
+    app.config.setdefault(
+        "WARMUP_PATHS",
+        os.getenv(
+            "WARMUP_PATHS",
+            "client:/users/doctors,client:/availability/,client:/appointments/",
+        ),
+    )
+
+
+def reset_after_fork(app):
+    """Drop the pooled connections a forked worker inherited from its parent
+    (gunicorn ``--preload``) without closing them, so the parent's sockets
+    are never used or shut from two processes; the worker opens its own."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    pool_stats.reset()
+
+
+def _open_connections(engine, count):
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+            connections[-1].execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()  # back to the pool, still open
+    return len(connections)
+
+
+def _warm_paths(app, spec):
+    """GET each ``role:path`` in ``spec`` as a made-up user of that role (id
+    0, which owns no rows), to import, compile and cache what those views
+    need before a real user waits for it. A path that fails is logged and
+    reported as ``None``."""
+    tokens, statuses = {}, {}
+    client = app.test_client()
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        role, _, path = item.partition(":")
+        if role not in tokens:
+            with app.app_context():
+                tokens[role] = create_access_token(
+                    identity="0",
+                    additional_claims={"role": role, "sv": 0},
+                    expires_delta=timedelta(minutes=1),
+                )
+        try:
+            response = client.get(
+                path, headers={"Authorization": f"Bearer {tokens[role]}"}
+            )
+            response.get_data()
+            statuses[path] = response.status_code
+        except Exception:  # a cold path is slow, not a reason to stay down
+            logger.exception("warm-up GET %s failed", path)
+            statuses[path] = None
+    return statuses
+
+
+def warm_up(app):
+    """Get a fresh worker ready before it accepts traffic: open its pool
+    connections, load the doctor search index and send ``WARMUP_PATHS``
+    through the app (filling the read cache and SQLAlchemy's compiled
+    statement cache). Returns what it did, with timings."""
+    if not app.config["WARMUP"]:
+        return {}
+    started = time.perf_counter()
+    report = {"pid": os.getpid()}
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if isinstance(engine.pool, QueuePool):
+                count = app.config["WARMUP_CONNECTIONS"]
+                count = engine.pool.size() if count is None else int(count)
+                opened = _open_connections(engine, count)
+                report.setdefault("connections", {})[key or "primary"] = opened
+
+        from src.users.search import get_search_index
+
+        index = get_search_index()
+        if index is not None:
+            index.rebuild()
+            report["search_index"] = True
+
+    report["paths"] = _warm_paths(app, app.config["WARMUP_PATHS"])
+    report["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("worker warm-up: %s", report)
+    return report
+
+
+def prepare_worker(app):
+    """``post_worker_init`` of gunicorn.conf.py: make a just-forked worker
+    safe (``reset_after_fork``) and warm (``warm_up``)."""
+    reset_after_fork(app)
+    return warm_up(app)
@@ -0,0 +1,49 @@
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+
+
+def wants_stream():
+    """True when the client asked for a streamed body via ``?stream=1`` or
+    ``Accept: application/x-ndjson``."""
+    if request.args.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def stream_query(query, serialize, key=None, extra=None):
+    """Stream the rows of ``query`` without building the full list in memory.
+
+    Rows are fetched ``STREAM_BATCH_SIZE`` at a time (server-side cursor where
+    the driver supports it) and encoded one by one, so the first bytes go out
+    before the query finishes. Sends NDJSON when the client accepts it,
+    otherwise a JSON array, wrapped as ``{key: [...], **extra}`` if ``key`` is
+    given.
+    """
+    dumps = current_app.json.dumps
+    rows = query.yield_per(STREAM_BATCH_SIZE)
+
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+
+        def generate_ndjson():
+            for row in rows:
+                yield dumps(serialize(row)) + "\n"
+
+        return Response(
+            stream_with_context(generate_ndjson()), mimetype=NDJSON_MIMETYPE
+        )
+
+    def generate_json():
+        yield f"{{{dumps(key)}: [" if key else "["
+        separator = ""
+        for row in rows:
+            yield separator + dumps(serialize(row))
+            separator = ","
+        if not key:
+            yield "]"
+            return
+        tail = "".join(f", {dumps(k)}: {dumps(v)}" for k, v in (extra or {}).items())
+        yield "]" + tail + "}"
+
+    return Response(stream_with_context(generate_json()), mimetype="application/json")
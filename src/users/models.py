@@ -2,14 +2,21 @@ from datetime import datetime
 from typing import Literal, Optional, cast
 
 from pydantic import BaseModel, EmailStr, Field
-from sqlalchemy import Boolean, Column, Enum, Integer, String
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy import Boolean, Column, Enum, Index, Integer, String
 
 from src.app import db
+from src.appointments.models import DoctorAppointmentsAction
+from src.helpers import passwords
+from src.helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.helpers.projection import Projection
 
 
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_last_name_first_name", "role", "last_name", "first_name"),
+        Index("ix_users_role_first_name", "role", "first_name"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     role = Column(Enum("admin", "client", "doctor"), nullable=False)
@@ -21,6 +28,10 @@ class User(db.Model):
     password_hash = Column(String(256), nullable=False)  # Hashed password
     status = Column(Enum("available", "not"), default="available")
     blocked = Column(Boolean, default=False)
+    # bumped to revoke every token issued so far (see src/helpers/revocation.py)
+    security_version = Column(Integer, nullable=False, default=0)
+    # bumped whenever the user's calendar feed would change (src/appointments/calendar.py)
+    calendar_version = Column(Integer, nullable=False, default=0)
 
     def __init__(
         self,
@@ -44,13 +55,29 @@ class User(db.Model):
         self.status = status
         self.blocked = blocked
 
-    # Hash and salt the password
+    # Hash and salt the password (runs in the hashing process pool)
     def hash_password(self, password: str) -> str:
-        return generate_password_hash(password)
+        return passwords.hash_password(password)
 
     # Check the hashed password
     def check_password(self, password: str) -> bool:
-        return check_password_hash(cast(str, self.password_hash), password)
+        return passwords.check_password(cast(str, self.password_hash), password)
+
+    # Upgrade a hash made with outdated parameters; call after check_password
+    def rehash_password_if_needed(self, password: str) -> bool:
+        if not passwords.needs_rehash(cast(str, self.password_hash)):
+            return False
+        self.password_hash = self.hash_password(password)
+        return True
+
+    # Public fields shown next to an appointment (see ``?expand=``)
+    def to_summary(self) -> dict:
+        return {
+            "id": self.id,
+            "role": self.role,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+        }
 
     # Convert User object to dictionary
     def to_dict(self) -> dict:
@@ -67,6 +94,23 @@ class User(db.Model):
         }
 
 
+# ``User.to_dict`` read straight from rows, for list endpoints
+USER_PROJECTION = Projection(
+    User,
+    [
+        "id",
+        "role",
+        "first_name",
+        "last_name",
+        "address",
+        "profile_desc",
+        "email",
+        "status",
+        "blocked",
+    ],
+)
+
+
 # Base model for User with common attributes
 class UserBase(BaseModel):
     role: Literal["admin", "client", "doctor"]
@@ -88,8 +132,31 @@ class UserUpdate(BaseModel):
     last_name: Optional[str] = Field(None, max_length=50)
     address: Optional[str] = Field(None, max_length=255)
     profile_desc: Optional[str] = Field(None, max_length=500)
-    status: Optional[Literal["available", "not"]]
-    blocked: Optional[bool]
+    status: Optional[Literal["available", "not"]] = None
+    blocked: Optional[bool] = None
+
+
+class DoctorSearch(BaseModel):
+    first_name: Optional[str] = Field(None, max_length=50, description="Prefix")
+    last_name: Optional[str] = Field(None, max_length=50, description="Prefix")
+    q: Optional[str] = Field(
+        None, max_length=100, description="Words to find in names or profile"
+    )
+    cursor: Optional[str] = Field(None, description="Cursor returned by the last page")
+    limit: int = Field(
+        DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE, description="Page size"
+    )
+
+
+class UserBulkBlock(BaseModel):
+    user_ids: list[int] = Field(
+        ..., min_length=1, max_length=10000, description="Users to change"
+    )
+    blocked: bool = Field(True, description="Block, or unblock with false")
+    appointments: Optional[DoctorAppointmentsAction] = Field(
+        None, description="Also handle the future appointments of blocked doctors"
+    )
+    dry_run: bool = Field(False, description="Report the counts, change nothing")
 
 
 class UserLogin(BaseModel):
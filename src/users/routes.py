@@ -1,44 +1,148 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import current_user, jwt_required
 from pydantic import ValidationError
+from sqlalchemy import or_
 from sqlalchemy.exc import SQLAlchemyError
 
 from src.app import db
-from src.users.models import User, UserUpdate
+from src.helpers.cache import cached
+from src.helpers.conditional import (
+    DOCTORS,
+    USERS,
+    bump_version,
+    conditional,
+)
+from src.helpers.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+)
+from src.helpers.profiler import query_budget
+from src.helpers.revocation import revoke_user_tokens
+from src.helpers.streaming import stream_query, wants_stream
+from src.users.models import USER_PROJECTION, DoctorSearch, User, UserUpdate
+from src.users.search import get_search_index
 from src.utils import role_required
 
 users = Blueprint("users", __name__)
 
 
 @users.get("/")
+@query_budget(3)
 @jwt_required()
 @role_required(["admin"])
+@cached(USERS)
 def get_all_users():
-    users = User.query.filter_by(role="client").all()
-    return jsonify({"users": [user.to_dict() for user in users]}), 200
+    query = USER_PROJECTION.query().filter(User.role == "client")
+    if wants_stream():
+        return stream_query(
+            query.order_by(User.id), USER_PROJECTION.to_dict, key="users"
+        )
+    return jsonify({"users": [USER_PROJECTION.to_dict(row) for row in query]}), 200
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _starts_with(column, prefix):
+    # A constant prefix lets the (role, last_name, first_name) and
+    # (role, first_name) indexes serve the match as a range scan.
+    return column.like(f"{_escape_like(prefix)}%", escape="\\")
+
+
+def _filtered_doctors(query, params):
+    """Apply the name prefixes and ``q`` terms of ``params`` to ``query``."""
+    first_name = (params.first_name or "").strip()
+    last_name = (params.last_name or "").strip()
+    name_filters = []
+    if first_name:
+        name_filters.append(_starts_with(User.first_name, first_name))
+    if last_name:
+        name_filters.append(_starts_with(User.last_name, last_name))
+    if name_filters:
+        query = query.filter(or_(*name_filters))
+
+    for word in (params.q or "").split():
+        pattern = f"%{_escape_like(word)}%"
+        query = query.filter(
+            or_(
+                User.first_name.like(pattern, escape="\\"),
+                User.last_name.like(pattern, escape="\\"),
+                User.profile_desc.like(pattern, escape="\\"),
+            )
+        )
+    return query
+
+
+def _indexed_search_page(index, params, order):
+    """Page through the in-process search index; returns (ids, next_cursor)."""
+    keys = index.search(params.q)
+    first_name = (params.first_name or "").strip().casefold()
+    last_name = (params.last_name or "").strip().casefold()
+    if first_name or last_name:
+        keys = [
+            key
+            for key in keys
+            if (first_name and key[1].casefold().startswith(first_name))
+            or (last_name and key[0].casefold().startswith(last_name))
+        ]
+    if params.cursor:
+        position = tuple(decode_cursor(params.cursor, order))
+        keys = [key for key in keys if key > position]
+
+    page = keys[: params.limit]
+    next_cursor = encode_cursor(page[-1]) if len(keys) > params.limit else None
+    return [key[2] for key in page], next_cursor
 
 
 @users.get("/doctors")
+@query_budget(4)
 @jwt_required()
 @role_required(["admin", "client"])
+@conditional(DOCTORS)
+@cached(DOCTORS)
 def get_all_doctors():
-    first_name = request.args.get("first_name", "").strip()
-    last_name = request.args.get("last_name", "").strip()
-
-    query = User.query.filter_by(role="doctor").all()
-    if len(first_name) == 0 and len(last_name) == 0:
-        return jsonify({"doctors": [doctor.to_dict() for doctor in query]})
-    doctors = filter(
-        lambda doc: (first_name != "" and first_name in doc.first_name)
-        or (last_name != "" and last_name in doc.last_name),
-        query,
+    try:
+        params = DoctorSearch(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"message": e.errors()}), 400
+
+    order = (User.last_name, User.first_name, User.id)
+    q = (params.q or "").strip()
+    index = get_search_index()
+
+    try:
+        if q and index is not None:
+            ids, next_cursor = _indexed_search_page(index, params, order)
+            by_id = {
+                row.id: row for row in USER_PROJECTION.query().filter(User.id.in_(ids))
+            }
+            doctors = [by_id[doctor_id] for doctor_id in ids if doctor_id in by_id]
+        else:
+            query = _filtered_doctors(
+                USER_PROJECTION.query().filter(User.role == "doctor"), params
+            )
+            doctors, next_cursor = keyset_paginate(
+                query, order, cursor=params.cursor, limit=params.limit
+            )
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+
+    return jsonify(
+        {
+            "doctors": [USER_PROJECTION.to_dict(row) for row in doctors],
+            "next_cursor": next_cursor,
+        }
     )
-    return jsonify({"doctors": [doctor.to_dict() for doctor in doctors]})
 
 
 @users.get("/<int:user_id>")
+@query_budget(3)
 @jwt_required()
 @role_required(["admin", "doctor", "client"])
+@cached(USERS)
 def get_user(user_id):
     user = User.query.get(user_id)
 
@@ -51,14 +155,12 @@ def get_user(user_id):
 @jwt_required()
 @role_required(["admin", "doctor", "client"])
 def update_user(user_id):
-    current_user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    current_user = User.query.get(current_user_id)
+    user = db.session.get(User, user_id)
 
-    if not user or not current_user:
+    if not user:
         return jsonify({"message": "User not found"}), 404
 
-    if current_user.role != "admin" and user.id != current_user_id:
+    if current_user.role != "admin" and user.id != current_user.id:
         return jsonify({"message": "Access forbidden"}), 403
 
     try:
@@ -73,10 +175,24 @@ def update_user(user_id):
             return jsonify({"message": "You cannot change the role"}), 403
 
         # Apply updates to the user object
-        for field, value in validated_data.model_dump(exclude_unset=True).items():
+        changes = validated_data.model_dump(exclude_unset=True)
+        if "blocked" in changes and current_user.role != "admin":
+            return jsonify({"message": "Only admins can block or unblock"}), 403
+        was_doctor, old_role = user.role == "doctor", user.role
+        for field, value in changes.items():
             setattr(user, field, value)
 
+        if user.role != old_role or changes.get("blocked"):
+            # tokens carry the role and must not outlive a block
+            revoke_user_tokens(user)
+
+        bump_version(USERS)
+        if was_doctor or user.role == "doctor":
+            bump_version(DOCTORS)
         db.session.commit()
+        index = get_search_index()
+        if index is not None:
+            index.update(user)
         return (
             jsonify({"message": "User updated successfully", "user": user.to_dict()}),
             200,
@@ -93,16 +209,21 @@ def update_user(user_id):
 @jwt_required()
 @role_required(["admin", "client", "doctor"])
 def delete_user(user_id):
-    user = User.query.get(user_id)
-    current_user = get_jwt_identity()
+    user = db.session.get(User, user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
-    if user.role != "admin" or str(user.id) != current_user:
+    if user.role != "admin" or user.id != current_user.id:
 
         return jsonify({"message": "User can access only his account"}), 403
     try:
+        # only admins get here, and they own no slots or appointments
+        revoke_user_tokens(user)
+        bump_version(USERS)
         db.session.delete(user)
         db.session.commit()
+        index = get_search_index()
+        if index is not None:
+            index.remove(user_id)
         return jsonify({"msg": "User deleted successfully"}), 200
 
     except SQLAlchemyError:
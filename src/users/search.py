@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+NGRAM_SIZE = 3
+
+
+def _normalize(text):
+    return " ".join((text or "").casefold().split())
+
+
+def _ngrams(text):
+    """Character n-grams of every word; words shorter than the n-gram size have
+    none and are matched by the substring check in ``search``."""
+    return {
+        word[i : i + NGRAM_SIZE]
+        for word in text.split()
+        for i in range(len(word) - NGRAM_SIZE + 1)
+    }
+
+
+class DoctorSearchIndex:
+    """In-process n-gram index over doctor names and ``profile_desc``.
+
+    Each worker keeps its own copy. Writes made through this worker update it
+    incrementally; the whole index is rebuilt from the database once it is
+    older than ``max_age`` seconds so changes made by other workers show up.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._postings = defaultdict(set)
+        self._docs = {}
+
+    def _add(self, doctor_id, first_name, last_name, profile_desc):
+        text = _normalize(f"{first_name} {last_name} {profile_desc or ''}")
+        sort_key = (last_name, first_name, doctor_id)
+        self._docs[doctor_id] = (text, sort_key)
+        for gram in _ngrams(text):
+            self._postings[gram].add(doctor_id)
+
+    def _remove(self, doctor_id):
+        doc = self._docs.pop(doctor_id, None)
+        if doc is None:
+            return
+        for gram in _ngrams(doc[0]):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(doctor_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def rebuild(self):
+        from src.app import db
+        from src.users.models import User
+
+        rows = db.session.execute(
+            db.select(
+                User.id, User.first_name, User.last_name, User.profile_desc
+            ).where(User.role == "doctor")
+        ).all()
+        with self._lock:
+            self._postings = defaultdict(set)
+            self._docs = {}
+            for row in rows:
+                self._add(*row)
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.max_age:
+            self.rebuild()
+
+    def update(self, user):
+        """Reflect a committed insert/update of ``user`` in the index."""
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(user.id)
+            if user.role == "doctor":
+                self._add(user.id, user.first_name, user.last_name, user.profile_desc)
+
+    def remove(self, user_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(user_id)
+
+    def search(self, query):
+        """Return ``(last_name, first_name, id)`` sort keys of matching doctors,
+        sorted. Every word of ``query`` must occur in the doctor's text.
+        """
+        self._ensure_fresh()
+        terms = _normalize(query).split()
+        with self._lock:
+            candidates = None
+            for gram in _ngrams(" ".join(terms)):
+                ids = self._postings.get(gram, set())
+                candidates = ids if candidates is None else candidates & ids
+            if candidates is None:
+                candidates = self._docs.keys()
+            matches = [
+                self._docs[doctor_id][1]
+                for doctor_id in candidates
+                if all(term in self._docs[doctor_id][0] for term in terms)
+            ]
+        return sorted(matches)
+
+
+def init_search(app):
+    """Attach the doctor search index when ``DOCTOR_SEARCH_INDEX`` is enabled."""
+    app.config.setdefault(
+        "DOCTOR_SEARCH_INDEX",
+        os.getenv("DOCTOR_SEARCH_INDEX", "").lower() in ("1", "true", "yes"),
+    )
+    app.config.setdefault(
+        "DOCTOR_SEARCH_INDEX_MAX_AGE",
+        int(os.getenv("DOCTOR_SEARCH_INDEX_MAX_AGE", 300)),
+    )
+    if app.config["DOCTOR_SEARCH_INDEX"]:
+        app.extensions["doctor_search"] = DoctorSearchIndex(
+            max_age=app.config["DOCTOR_SEARCH_INDEX_MAX_AGE"]
+        )
+
+
+def get_search_index():
+    from flask import current_app
+
+    return current_app.extensions.get("doctor_search")
@@ -1,19 +1,20 @@
 from functools import wraps
 
 from flask import has_request_context, jsonify
-from flask_jwt_extended import get_jwt_identity, jwt_required
-
-from src.users.models import User
+from flask_jwt_extended import get_current_user, jwt_required
 
 
 def role_required(roles):
-    """Role-based access decorator."""
+    """Role-based access decorator.
+
+    Must be applied below ``@jwt_required()``; the role comes from the token's
+    claims (see ``TokenUser``), so no query is issued here.
+    """
 
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
+            user = get_current_user()
 
             if not user:
                 return jsonify({"error": "User not found"}), 404